@@ -3,6 +3,20 @@ import datetime
 
 DB_PATH = "kortex_memory.db"
 
+# Called with (task_type, task) whenever a reminder or alarm is added, so a scheduler can pick it up.
+_task_listeners = []
+
+def add_task_listener(callback):
+    _task_listeners.append(callback)
+
+def remove_task_listener(callback):
+    if callback in _task_listeners:
+        _task_listeners.remove(callback)
+
+def _notify_task_added(task_type, task):
+    for callback in list(_task_listeners):
+        callback(task_type, task)
+
 def get_db_connection():
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
@@ -58,23 +72,30 @@ def get_notes(limit=5):
 
 def add_reminder(reminder_text, due_at):
     conn = get_db_connection()
-    conn.execute("INSERT INTO reminders (reminder_text, due_at) VALUES (?, ?)", (reminder_text, due_at))
+    cursor = conn.execute("INSERT INTO reminders (reminder_text, due_at) VALUES (?, ?)", (reminder_text, due_at))
     conn.commit()
     conn.close()
+    _notify_task_added("reminders", {'id': cursor.lastrowid, 'reminder_text': reminder_text, 'due_at': due_at})
 
 def add_alarm(due_at, alarm_name="Alarm"):
     conn = get_db_connection()
-    conn.execute("INSERT INTO alarms (alarm_name, due_at) VALUES (?, ?)", (alarm_name, due_at))
+    cursor = conn.execute("INSERT INTO alarms (alarm_name, due_at) VALUES (?, ?)", (alarm_name, due_at))
     conn.commit()
     conn.close()
+    _notify_task_added("alarms", {'id': cursor.lastrowid, 'alarm_name': alarm_name, 'due_at': due_at})
 
-def get_due_tasks(task_type="reminders"):
+def get_pending_tasks(task_type="reminders"):
+    """Every reminder or alarm that has not fired yet, including overdue ones."""
     conn = get_db_connection()
-    now = datetime.datetime.now()
-    query = f"SELECT * FROM {task_type} WHERE due_at <= ? AND triggered = 0"
-    tasks = conn.execute(query, (now,)).fetchall()
+    query = f"SELECT * FROM {task_type} WHERE triggered = 0 ORDER BY due_at"
+    tasks = conn.execute(query).fetchall()
     conn.close()
-    return tasks
+    return [dict(task, due_at=_as_datetime(task['due_at'])) for task in tasks]
+
+def _as_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
 
 def mark_task_triggered(task_id, task_type="reminders"):
     conn = get_db_connection()
@@ -0,0 +1,255 @@
+"""A stand-in for the Ollama HTTP API, for running the LLM path without a model.
+
+It answers /api/chat (streamed as NDJSON or not), /api/generate, /api/tags and /api/version
+from a script of replies, with injectable prompt-processing and per-token latency. A script
+is a JSON list of rules; the first whose "match" regex is found in the last user message wins:
+
+    [
+        {"match": "weather", "tool_calls": [{"name": "get_weather", "arguments": {"location": "Paris"}}]},
+        {"match": "your name", "content": "My name is Kortex."}
+    ]
+
+Run it standalone and point `ollama.host` in the config at it:
+
+    python -m kortex.fake_ollama --port 11435 --prompt-latency 0.3 --token-latency 0.03
+
+or benchmark LLMClient against it offline:
+
+    python -m kortex.fake_ollama --benchmark 3 --prompt-latency 0.3 --token-latency 0.03
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+from kortex.stats import percentile
+
+DEFAULT_SCRIPT = [
+    {"match": r"\btime\b", "tool_calls": [{"name": "get_current_time", "arguments": {}}]},
+    {"match": r"\bweather\b", "tool_calls": [{"name": "get_weather", "arguments": {"location": "Paris"}}]},
+    {"match": r"\bcoin\b", "tool_calls": [{"name": "flip_coin", "arguments": {}}]},
+    {"match": r"\bjoke\b", "tool_calls": [{"name": "tell_joke", "arguments": {}}]},
+    {"match": r"tool output", "content": "Here is what I found. Everything went as planned."},
+    {"match": "", "content": "This is a scripted reply from the fake Ollama server. It has two sentences."},
+]
+
+
+class FakeOllamaServer:
+    """Serves scripted Ollama replies on a background thread; port=0 picks a free port."""
+
+    def __init__(self, script=None, model="granite4:micro", host="127.0.0.1", port=0,
+                 prompt_latency=0.0, token_latency=0.0):
+        self.script = [dict(rule, pattern=re.compile(rule.get("match", ""), re.IGNORECASE))
+                       for rule in (script or DEFAULT_SCRIPT)]
+        self.model = model
+        self.prompt_latency = prompt_latency
+        self.token_latency = token_latency
+        self.requests = []
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reply_for(self, messages):
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        for rule in self.script:
+            if rule["pattern"].search(prompt):
+                return rule
+        return {"content": ""}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Small NDJSON chunks must not wait for Nagle's algorithm, or latencies are skewed.
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": server.model, "model": server.model, "size": 0}]})
+                elif self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append((self.path, request))
+                if self.path == "/api/chat":
+                    self._chat(request)
+                elif self.path == "/api/generate":
+                    self._send_json({"model": request.get("model"), "response": "", "done": True})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def _chat(self, request):
+                start = time.perf_counter()
+                rule = server.reply_for(request.get("messages") or [])
+                time.sleep(server.prompt_latency)
+                prompt_ns = int(1e9 * (time.perf_counter() - start))
+                tokens = re.findall(r"\S+\s*", rule.get("content", ""))
+                tool_calls = [{"function": call} for call in rule.get("tool_calls", [])]
+                if not request.get("tools"):
+                    tool_calls = []
+
+                def final(message):
+                    total_ns = int(1e9 * (time.perf_counter() - start))
+                    return {
+                        "model": request.get("model"), "message": message, "done": True, "done_reason": "stop",
+                        "total_duration": total_ns, "load_duration": 0,
+                        "prompt_eval_count": sum(len(m.get("content", "").split()) for m in request.get("messages") or []),
+                        "prompt_eval_duration": prompt_ns,
+                        "eval_count": max(len(tokens), 1), "eval_duration": max(total_ns - prompt_ns, 1),
+                    }
+
+                if not request.get("stream", True):
+                    time.sleep(server.token_latency * len(tokens))
+                    message = {"role": "assistant", "content": "" if tool_calls else "".join(tokens)}
+                    if tool_calls:
+                        message["tool_calls"] = tool_calls
+                    self._send_json(final(message))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                if tool_calls:
+                    time.sleep(server.token_latency)
+                    self._chunk({"model": request.get("model"), "done": False,
+                                 "message": {"role": "assistant", "content": "", "tool_calls": tool_calls}})
+                else:
+                    for token in tokens:
+                        time.sleep(server.token_latency)
+                        self._chunk({"model": request.get("model"), "done": False,
+                                     "message": {"role": "assistant", "content": token}})
+                self._chunk(final({"role": "assistant", "content": ""}))
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, payload):
+                line = (json.dumps(payload) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def benchmark(server, rounds, config_path=None):
+    """Runs the labelled tool-retrieval utterances through LLMClient against the fake server."""
+    from kortex.llm import LLMClient
+    from kortex.tools import build_tool_registry
+    from kortex.tool_retrieval import EVAL_UTTERANCES
+
+    config = {}
+    if config_path and os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+    config['ollama_model'] = server.model
+    config['ollama'] = dict(config.get('ollama') or {}, host=server.url)
+    config['llm'] = dict(config.get('llm') or {}, response_cache={'enabled': False})
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+        yaml.safe_dump(config, f)
+    try:
+        llm = LLMClient(build_tool_registry(), f.name)
+    finally:
+        os.remove(f.name)
+
+    blocking_ms, first_event_ms = [], []
+    for _ in range(rounds):
+        for text, _tool in EVAL_UTTERANCES:
+            start = time.perf_counter()
+            llm.get_response(text)
+            blocking_ms.append(1000.0 * (time.perf_counter() - start))
+            start = time.perf_counter()
+            for event in llm.stream_response(text):
+                if event['type'] != 'done' and len(first_event_ms) < len(blocking_ms):
+                    first_event_ms.append(1000.0 * (time.perf_counter() - start))
+
+    def describe(values):
+        return (f"mean {statistics.mean(values):.1f} ms, p50 {percentile(values, 0.5):.1f} ms, "
+                f"p95 {percentile(values, 0.95):.1f} ms")
+
+    print(f"\n{len(blocking_ms)} requests per mode against {server.url}")
+    print(f"  get_response (blocking):   {describe(blocking_ms)}")
+    print(f"  stream_response (1st event): {describe(first_event_ms)}")
+    print(f"  client retries: {llm.client.retry_count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve scripted Ollama replies for offline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="granite4:micro")
+    parser.add_argument("--script", help="JSON file with reply rules.")
+    parser.add_argument("--prompt-latency", type=float, default=0.0, help="Seconds before the first token.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token.")
+    parser.add_argument("--benchmark", type=int, metavar="ROUNDS",
+                        help="Run LLMClient against the server ROUNDS times over the labelled utterances, then exit.")
+    parser.add_argument("--config", default="kortex/config.yaml", help="Config to benchmark with.")
+    args = parser.parse_args(argv)
+
+    script = None
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+    server = FakeOllamaServer(script, args.model, args.host, 0 if args.benchmark else args.port,
+                              args.prompt_latency, args.token_latency)
+    if args.benchmark:
+        with server:
+            benchmark(server, args.benchmark, args.config)
+        return
+
+    print(f"Fake Ollama serving {args.model} on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
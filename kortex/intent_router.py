@@ -0,0 +1,159 @@
+import re
+import time
+from collections import Counter
+
+import yaml
+
+from kortex.tools.schema import ToolSchemas
+
+# Commands common enough to be worth answering without a model round-trip. Each pattern must
+# match the whole normalized utterance; named groups become tool parameters.
+_DURATION = r'(?P<duration_str>\d+ (?:hours?|minutes?|seconds?)(?:(?: and)? \d+ (?:hours?|minutes?|seconds?))*)'
+_LEVEL = r'(?P<level>100|\d{1,2})(?: percent)?'
+
+DEFAULT_RULES = [
+    ("get_current_time", 0.98, r'(?:whats|what is) the (?:current )?time(?: (?:now|right now))?'),
+    ("get_current_time", 0.98, r'what time is it(?: (?:now|right now))?'),
+    ("get_current_time", 0.95, r'(?:tell me|do you know) (?:what )?the time(?: is)?'),
+    ("get_current_date", 0.98, r'(?:whats|what is) (?:the date|todays date|the date today)(?: today)?'),
+    ("get_current_date", 0.95, r'what day is (?:it|today)(?: today)?'),
+    ("calculate_future_date", 0.95, r'(?:whats|what is) the date in (?P<days>\d+) days?'),
+    ("flip_coin", 0.98, r'(?:flip|toss) a coin'),
+    ("flip_coin", 0.9, r'heads or tails'),
+    ("tell_joke", 0.95, r'(?:tell|say) (?:me )?(?:a|another) joke'),
+    ("set_system_volume", 0.97, r'(?:set|change|turn) (?:the )?(?:system )?volume (?:to|at) ' + _LEVEL),
+    ("set_system_volume", 0.9, r'volume (?:to )?' + _LEVEL),
+    ("set_screen_brightness", 0.97, r'(?:set|change|turn) (?:the )?(?:screen )?brightness (?:to|at) ' + _LEVEL),
+    ("set_screen_brightness", 0.9, r'brightness (?:to )?' + _LEVEL),
+    ("set_timer", 0.97, r'(?:set|start) (?:a |the )?timer (?:for )?' + _DURATION),
+    ("set_timer", 0.95, r'(?:set |start )?(?:a )?' + _DURATION + r' timer'),
+    ("cancel_timer", 0.97, r'(?:cancel|stop|clear|delete) (?:the |my )?timer'),
+    ("read_notes", 0.95, r'(?:read|show) (?:me )?my (?:last |latest )?note'),
+]
+
+_FILLER_PREFIX = re.compile(r'^(?:(?:hey|ok|okay|kortex|please|can you|could you|would you)\s+)+')
+_FILLER_SUFFIX = re.compile(r'(?:\s+(?:please|for me|now please))+$')
+
+_UNITS = {word: value for value, word in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+    "fifteen sixteen seventeen eighteen nineteen".split())}
+_TENS = {word: 10 * (value + 2) for value, word in enumerate(
+    "twenty thirty forty fifty sixty seventy eighty ninety".split())}
+
+
+def _read_number(words, i):
+    """Reads a spelled-out number below 1000 starting at words[i]; returns (value, next index)."""
+    value = None
+    j = i
+    while j < len(words):
+        word = words[j]
+        if word in _UNITS and (value is None or value % 100 == 0 or (value % 10 == 0 and value % 100 >= 20 and _UNITS[word] < 10)):
+            value = (value or 0) + _UNITS[word]
+        elif word in _TENS and (value is None or value % 100 == 0):
+            value = (value or 0) + _TENS[word]
+        elif word == "hundred" and value is not None and 0 < value < 10:
+            value *= 100
+        elif word == "a" and value is None and j + 1 < len(words) and words[j + 1] == "hundred":
+            value = 1
+        elif (word == "and" and value is not None and value >= 100 and value % 100 == 0
+              and j + 1 < len(words) and (words[j + 1] in _UNITS or words[j + 1] in _TENS)):
+            pass
+        else:
+            break
+        j += 1
+    return value, j
+
+
+def normalize(text):
+    """Lowercases, drops punctuation and politeness fillers, and turns spelled-out numbers into digits.
+
+    Vosk transcribes "set volume to forty five" rather than "45", so the rules only ever see digits.
+    """
+    text = re.sub(r"[^\w\s%]", "", text.lower().replace("%", " percent"))
+    words = text.split()
+    normalized = []
+    i = 0
+    while i < len(words):
+        value, j = _read_number(words, i)
+        if value is None:
+            normalized.append(words[i])
+            i += 1
+        else:
+            normalized.append(str(value))
+            i = j
+    text = " ".join(normalized)
+    text = _FILLER_PREFIX.sub("", text)
+    return _FILLER_SUFFIX.sub("", text)
+
+
+class IntentRouter:
+    """Maps common commands straight onto tool calls without asking the LLM.
+
+    Utterances are normalized and matched against compiled whole-utterance patterns; a match
+    whose confidence is at least min_confidence is returned in the same shape as
+    LLMClient.get_response, with "source": "router" and its confidence. Everything else
+    returns None and goes to the LLM as before.
+    """
+
+    def __init__(self, tool_registry, config_path="kortex/config.yaml", tool_schemas=None, rules=DEFAULT_RULES):
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+        router_config = config.get('router', {})
+        self.enabled = router_config.get('enabled', True)
+        self.min_confidence = router_config.get('min_confidence', 0.9)
+        self.tool_schemas = tool_schemas or ToolSchemas(tool_registry)
+        self.rules = [
+            (tool_name, confidence, re.compile(pattern))
+            for tool_name, confidence, pattern in rules
+            if tool_name in tool_registry and confidence >= self.min_confidence
+        ]
+        self.total = 0
+        self.hits = Counter()
+        self._confidence_sum = 0.0
+        print(f"Intent router ready with {len(self.rules)} rules (min confidence {self.min_confidence}).")
+
+    def route(self, text, record=True):
+        """Returns a tool_call response for text, or None. With record=False, stats and logs are left alone."""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        normalized = normalize(text)
+        for tool_name, confidence, pattern in self.rules:
+            match = pattern.fullmatch(normalized)
+            if not match:
+                continue
+            try:
+                parameters = self.tool_schemas.coerce_arguments(tool_name, match.groupdict())
+            except ValueError:
+                continue
+            response = {
+                "type": "tool_call",
+                "data": {"tool_name": tool_name, "parameters": parameters},
+                "source": "router",
+                "confidence": confidence,
+            }
+            if record:
+                self.total += 1
+                self.hits[tool_name] += 1
+                self._confidence_sum += confidence
+                elapsed_ms = 1000.0 * (time.perf_counter() - start)
+                print(f"Intent router: '{normalized}' -> {tool_name} (confidence {confidence:.2f}) "
+                      f"in {elapsed_ms:.2f} ms, hit rate {self.hit_rate:.0%}")
+            return response
+        if record:
+            self.total += 1
+        return None
+
+    @property
+    def hit_rate(self):
+        return sum(self.hits.values()) / self.total if self.total else 0.0
+
+    def stats(self):
+        hits = sum(self.hits.values())
+        return {
+            "utterances": self.total,
+            "hits": hits,
+            "hit_rate": self.hit_rate,
+            "mean_confidence": self._confidence_sum / hits if hits else None,
+            "hits_by_tool": dict(self.hits),
+        }
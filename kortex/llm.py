@@ -1,7 +1,149 @@
-import ollama
 import json
+import os
+import threading
+import time
 import yaml
 import re
+from collections import OrderedDict
+from kortex.tools.schema import ToolSchemas
+from kortex.tool_retrieval import ToolRetriever
+from kortex.intent_router import normalize
+from kortex.ollama_client import get_client
+from kortex import tracing
+
+SYSTEM_PROMPT = (
+    "You are Kortex, a helpful voice assistant. Your primary function is to provide direct, "
+    "natural language answers. Only use a tool if the user's request *explicitly and clearly* "
+    "matches one of the available tool descriptions. For simple conversational queries that do not "
+    "match any tool (like 'what is your name?' or 'give me a random number'), you MUST provide a "
+    "direct text-based answer and MUST NOT call a tool. When asked to 'open' something, prioritize "
+    "using the `find_application` tool for application names over `open_website`."
+)
+
+# Duration fields Ollama reports on every response, in nanoseconds.
+_TIMING_FIELDS = ('load_duration', 'prompt_eval_duration', 'eval_duration', 'total_duration')
+
+
+def extract_timings(response):
+    """Converts Ollama's per-response counters into milliseconds and token counts."""
+    timings = {field.replace('_duration', '_ms'): (response.get(field) or 0) / 1e6 for field in _TIMING_FIELDS}
+    timings['prompt_eval_count'] = response.get('prompt_eval_count') or 0
+    timings['eval_count'] = response.get('eval_count') or 0
+    return timings
+
+
+class ResponseCache:
+    """Remembers which tool the LLM picked, and with which arguments, for a transcript.
+
+    Only decisions are stored, never tool output: a cached command still runs its tool, so
+    time-sensitive tools always answer fresh. Keys combine the normalized transcript, the model
+    and the tool-schema hash, so changing either makes old decisions unreachable. Entries expire
+    after ttl_seconds, the least recently used are evicted beyond max_entries, and the cache can
+    be persisted to a JSON file. The file is written by a timer save_delay_seconds after the
+    first unsaved change, and by close(), never on the thread that stored the decision.
+    """
+
+    def __init__(self, model, schema_hash, ttl_seconds=86400, max_entries=256, path=None, save_delay_seconds=5.0):
+        self.model = model
+        self.schema_hash = schema_hash
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.save_delay = save_delay_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._save_timer = None
+        self._load()
+
+    def _key(self, transcript):
+        return f"{self.model}|{self.schema_hash}|{normalize(transcript)}"
+
+    def get(self, transcript):
+        key = self._key(transcript)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['stored_at'] > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"tool_name": entry['tool_name'], "parameters": dict(entry['parameters'])}
+
+    def put(self, transcript, decision):
+        with self._lock:
+            key = self._key(transcript)
+            self._entries[key] = {
+                "tool_name": decision['tool_name'],
+                "parameters": decision['parameters'],
+                "stored_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            if self.path and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable LLM response cache {self.path}: {e}")
+            return
+        prefix = f"{self.model}|{self.schema_hash}|"
+        now = time.time()
+        for key, entry in entries.items():
+            if key.startswith(prefix) and now - entry['stored_at'] <= self.ttl_seconds:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def flush(self):
+        """Writes the cache file if anything changed since it was last written."""
+        with self._lock:
+            self._save_timer = None
+            if not self.path or not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save LLM response cache: {e}")
+
+    def close(self):
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "entries": len(self._entries),
+        }
 
 
 class LLMClient:
@@ -9,71 +151,169 @@ class LLMClient:
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
         self.model = config['ollama_model']
+        self.client = get_client(config)
+        llm_config = config.get('llm', {})
+        # How long Ollama keeps the model in memory after a request: a duration such as '30m',
+        # -1 to keep it loaded while Kortex runs, or 0 to unload right away.
+        self.keep_alive = llm_config.get('keep_alive', '30m')
+        self.unload_on_exit = llm_config.get('unload_on_exit', False)
         self.tool_registry = tool_registry
-        print(f"LLM Client Initialized with {self.model} and native tool support.")
-
-    def _get_tool_definitions(self):
-        tool_definitions = []
-        for name, func in self.tool_registry.items():
-            doc_lines = func.__doc__.split('\n')
-            description = doc_lines[0].strip()
-            params_line = next((line for line in doc_lines if "Parameters:" in line), None)
-            properties = {}
-            if params_line:
-                try:
-                    params_str = params_line.split("Parameters:")[1].strip()
-                    param_spec = json.loads(params_str)
-                    for param_name, desc in param_spec.items():
-                        properties[param_name] = {"type": "string", "description": desc}
-                except (json.JSONDecodeError, IndexError):
-                    print(f"Warning: Could not parse parameters for tool '{name}'")
-            
-            tool_definitions.append({
-                "type": "function",
-                "function": {
-                    "name": name,
-                    "description": description,
-                    "parameters": {"type": "object", "properties": properties}
-                }
-            })
-        return tool_definitions
+        self.tool_schemas = ToolSchemas(tool_registry)
+        selection_config = llm_config.get('tool_selection', {})
+        self.tool_retriever = None
+        if selection_config.get('enabled', True):
+            self.tool_retriever = ToolRetriever(
+                self.tool_schemas, selection_config.get('top_k', 6), selection_config.get('core_tools', ())
+            )
+        cache_config = llm_config.get('response_cache', {})
+        self.response_cache = None
+        if cache_config.get('enabled', True):
+            self.response_cache = ResponseCache(
+                self.model, self.tool_schemas.hash,
+                ttl_seconds=cache_config.get('ttl_seconds', 86400),
+                max_entries=cache_config.get('max_entries', 256),
+                path=cache_config.get('path', 'cache/llm_decisions.json') if cache_config.get('persist', True) else None,
+                save_delay_seconds=cache_config.get('save_delay_seconds', 5)
+            )
+        self.last_timings = None
+        self.last_stream_metrics = None
+        self.warmup_timings = None
+        print(f"LLM Client Initialized with {self.model} and native tool support "
+              f"({len(tool_registry)} tools, {len(self.tool_schemas.payload)} byte schema).")
+
+    def _get_tool_definitions(self, user_prompt=None):
+        """Returns the tool definitions to send, narrowed to the relevant ones when a prompt is given."""
+        if user_prompt is None or self.tool_retriever is None:
+            return self.tool_schemas.definitions
+        selected = self.tool_retriever.select(user_prompt)
+        print(f"LLM tools sent: {len(selected)}/{len(self.tool_schemas.definitions)} {selected}")
+        return self.tool_schemas.definitions_for(selected)
+
+    def _record_timings(self, response, label):
+        self.last_timings = extract_timings(response)
+        t = self.last_timings
+        if tracing.enabled():
+            # Ollama reports durations, not times; lay them out backwards from when the reply ended.
+            end = time.perf_counter()
+            generation_start = end - t['eval_ms'] / 1000.0
+            prompt_start = generation_start - t['prompt_eval_ms'] / 1000.0
+            tracing.record("llm.load", prompt_start - t['load_ms'] / 1000.0, prompt_start, label=label)
+            tracing.record("llm.prompt_eval", prompt_start, generation_start, label=label,
+                           tokens=t['prompt_eval_count'])
+            tracing.record("llm.generation", generation_start, end, label=label, tokens=t['eval_count'])
+        print(f"LLM timings ({label}): load {t['load_ms']:.0f} ms, "
+              f"prompt eval {t['prompt_eval_count']} tokens in {t['prompt_eval_ms']:.0f} ms, "
+              f"generation {t['eval_count']} tokens in {t['eval_ms']:.0f} ms, total {t['total_ms']:.0f} ms")
+        return self.last_timings
+
+    def warmup(self):
+        """Loads the model and primes the system prompt and tool block in Ollama's prompt cache.
+
+        With tool selection on, the tool block primed is the core set, which is exactly what an
+        utterance matching no tool sends.
+        Generates a single token so the request costs little beyond the load itself.
+        """
+        start = time.perf_counter()
+        if self.tool_retriever is None:
+            tools = self.tool_schemas.definitions
+        else:
+            tools = self.tool_schemas.definitions_for(self.tool_retriever.core_tools)
+        try:
+            response = self.client.chat(
+                model=self.model,
+                messages=[{'role': 'system', 'content': SYSTEM_PROMPT}, {'role': 'user', 'content': 'Hello'}],
+                tools=list(tools),
+                stream=False,
+                options={'temperature': 0.0, 'num_predict': 1},
+                keep_alive=self.keep_alive
+            )
+            self.warmup_timings = self._record_timings(response, "warmup")
+            print(f"LLM warmed up in {1000.0 * (time.perf_counter() - start):.0f} ms.")
+        except Exception as e:
+            print(f"LLM warmup failed: {e}")
+
+    def start_warmup(self):
+        """Runs warmup() on a background thread so the rest of startup is not held up."""
+        thread = threading.Thread(target=self.warmup, daemon=True)
+        thread.start()
+        return thread
+
+    def _resolve_tool_calls(self, tool_calls):
+        """Turns the model's tool calls into a response dict, or None if none names a known tool.
+
+        A single call keeps the original {"type": "tool_call"} shape; several become
+        {"type": "tool_calls", "data": [...]}. Calls to unknown tools or with unusable
+        arguments are dropped.
+        """
+        resolved = []
+        rejected = False
+        for tool_call in tool_calls:
+            tool_name = tool_call['function']['name']
+            if tool_name not in self.tool_registry:
+                continue
+            try:
+                parameters = self.tool_schemas.coerce_arguments(tool_name, tool_call['function']['arguments'])
+            except ValueError as e:
+                print(f"Rejected arguments for tool '{tool_name}': {e}")
+                rejected = True
+                continue
+            resolved.append({"tool_name": tool_name, "parameters": parameters})
+
+        if not resolved:
+            if rejected:
+                return {"type": "text", "data": "Sorry, I didn't catch all the details for that."}
+            return None
+        print(f"LLM decided to call: {', '.join(call['tool_name'] for call in resolved)}")
+        if len(resolved) == 1:
+            return {"type": "tool_call", "data": resolved[0]}
+        return {"type": "tool_calls", "data": resolved}
+
+    def _cached_decision(self, user_prompt):
+        if self.response_cache is None:
+            return None
+        decision = self.response_cache.get(user_prompt)
+        if decision is None or decision['tool_name'] not in self.tool_registry:
+            return None
+        stats = self.response_cache.stats()
+        print(f"LLM decision cache hit: {decision['tool_name']} (hit rate {stats['hit_rate']:.0%})")
+        return {"type": "tool_call", "data": decision, "source": "cache"}
+
+    def _remember_decision(self, user_prompt, response):
+        if self.response_cache is not None and response['type'] == 'tool_call':
+            self.response_cache.put(user_prompt, response['data'])
 
     def get_response(self, user_prompt, use_tools=True):
         print(f"LLM processing: '{user_prompt}'")
-        
-        system_prompt = (
-            "You are Kortex, a helpful voice assistant. Your primary function is to provide direct, "
-            "natural language answers. Only use a tool if the user's request *explicitly and clearly* "
-            "matches one of the available tool descriptions. For simple conversational queries that do not "
-            "match any tool (like 'what is your name?' or 'give me a random number'), you MUST provide a "
-            "direct text-based answer and MUST NOT call a tool. When asked to 'open' something, prioritize "
-            "using the `find_application` tool for application names over `open_website`."
-        )
+        if use_tools:
+            cached = self._cached_decision(user_prompt)
+            if cached:
+                tracing.record("llm.cache_hit", time.perf_counter(), time.perf_counter())
+                return cached
+
         messages = [
-            {'role': 'system', 'content': system_prompt},
+            {'role': 'system', 'content': SYSTEM_PROMPT},
             {'role': 'user', 'content': user_prompt}
         ]
-        
-        tools = self._get_tool_definitions() if use_tools else []
+
+        tools = list(self._get_tool_definitions(user_prompt)) if use_tools else []
 
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=messages,
-                tools=tools,
-                stream=False,
-                options={'temperature': 0.0}
-            )
+            with tracing.span("llm.chat", stream=False, tools=len(tools)):
+                response = self.client.chat(
+                    model=self.model,
+                    messages=messages,
+                    tools=tools,
+                    stream=False,
+                    options={'temperature': 0.0},
+                    keep_alive=self.keep_alive
+                )
+            self._record_timings(response, "tools" if use_tools else "text")
 
             if response['message'].get('tool_calls'):
-                tool_call = response['message']['tool_calls'][0]['function']
-                tool_name = tool_call['name']
-                parameters = tool_call['arguments']
-                
-                if tool_name in self.tool_registry:
-                    reformatted_call = {"tool_name": tool_name, "parameters": parameters}
-                    print(f"LLM decided to call tool: {reformatted_call['tool_name']}")
-                    return {"type": "tool_call", "data": reformatted_call}
+                tool_response = self._resolve_tool_calls(response['message']['tool_calls'])
+                if tool_response:
+                    self._remember_decision(user_prompt, tool_response)
+                    return tool_response
 
             text_response = response['message']['content'].strip()
             return {"type": "text", "data": text_response}
@@ -81,4 +321,80 @@ class LLMClient:
         except Exception as e:
             error_message = f"An error occurred with the LLM: {e}"
             print(error_message)
-            return {"type": "text", "data": "I'm sorry, I encountered an error."}
\ No newline at end of file
+            return {"type": "text", "data": "I'm sorry, I encountered an error."}
+
+    def stream_response(self, user_prompt, use_tools=True):
+        """Yields events while the model is still generating.
+
+        Events are {"type": "delta", "data": text} for content as it arrives, a "tool_call" or
+        "tool_calls" event (same shapes as get_response) as soon as Ollama reports them, and a final
+        {"type": "done", "data": metrics} with time-to-first-token, tokens/sec and Ollama's
+        own prompt-eval and total durations.
+        """
+        print(f"LLM streaming: '{user_prompt}'")
+        if use_tools:
+            cached = self._cached_decision(user_prompt)
+            if cached:
+                tracing.record("llm.cache_hit", time.perf_counter(), time.perf_counter())
+                yield cached
+                yield {"type": "done", "data": {"cached": True}}
+                return
+        messages = [
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {'role': 'user', 'content': user_prompt}
+        ]
+        tools = list(self._get_tool_definitions(user_prompt)) if use_tools else []
+
+        start = time.perf_counter()
+        first_token_at = None
+        final_chunk = None
+        try:
+            for chunk in self.client.chat(
+                model=self.model,
+                messages=messages,
+                tools=tools,
+                stream=True,
+                options={'temperature': 0.0},
+                keep_alive=self.keep_alive
+            ):
+                message = chunk['message']
+                if first_token_at is None and (message.get('content') or message.get('tool_calls')):
+                    first_token_at = time.perf_counter()
+                if message.get('tool_calls'):
+                    tool_response = self._resolve_tool_calls(message['tool_calls'])
+                    if tool_response and tool_response['type'] in ('tool_call', 'tool_calls'):
+                        self._remember_decision(user_prompt, tool_response)
+                        yield tool_response
+                    elif tool_response:
+                        yield {"type": "delta", "data": tool_response['data']}
+                if message.get('content'):
+                    yield {"type": "delta", "data": message['content']}
+                if chunk.get('done'):
+                    final_chunk = chunk
+        except Exception as e:
+            print(f"An error occurred with the LLM: {e}")
+            yield {"type": "delta", "data": "I'm sorry, I encountered an error."}
+
+        metrics = self._record_timings(final_chunk, "stream") if final_chunk else {}
+        metrics['time_to_first_token_ms'] = 1000.0 * (first_token_at - start) if first_token_at else None
+        metrics['tokens_per_sec'] = (
+            metrics['eval_count'] / (metrics['eval_ms'] / 1000.0) if metrics.get('eval_ms') else None
+        )
+        metrics['wall_ms'] = 1000.0 * (time.perf_counter() - start)
+        tracing.record("llm.chat", start, time.perf_counter(), stream=True, tools=len(tools),
+                       time_to_first_token_ms=metrics['time_to_first_token_ms'])
+        if metrics['time_to_first_token_ms'] is not None:
+            print(f"LLM time to first token: {metrics['time_to_first_token_ms']:.0f} ms")
+        self.last_stream_metrics = metrics
+        yield {"type": "done", "data": metrics}
+
+    def close(self):
+        if self.response_cache is not None:
+            self.response_cache.close()
+        if not self.unload_on_exit:
+            return
+        try:
+            self.client.generate(model=self.model, prompt='', keep_alive=0)
+            print(f"Unloaded {self.model} from Ollama.")
+        except Exception as e:
+            print(f"Could not unload {self.model}: {e}")
@@ -1,17 +1,42 @@
 import sys
 import os
+import threading
+import time
+from kortex import startup_profile
+if startup_profile.requested():
+    startup_profile.install()
 import pythoncom
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QObject, QThread, pyqtSignal, QEventLoop, pyqtSlot, QTimer
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, QEventLoop, pyqtSlot, QTimer
 
 from kortex.gui import KortexGUI, AppState
 from kortex.stt import SpeechToText
-from kortex.tts import TextToSpeech
+from kortex.tts import TextToSpeech, iter_sentences
+from kortex.speech_queue import SpeechScheduler, PRIORITY_ALARM, PRIORITY_REPLY
 from kortex.llm import LLMClient
-from kortex.tools import web, system, productivity, communication
+from kortex.intent_router import IntentRouter
+from kortex.tool_executor import ToolExecutor
+from kortex.speculation import Speculator
+from kortex.pipeline import Pipeline, Stage, SourceStage
+from kortex.scheduler import TaskScheduler
+from kortex import tracing
+from kortex.tools import build_tool_registry
 from kortex import database
 import yaml
 
+# Fixed utterances that are pre-rendered at startup so they play without synthesis latency.
+CACHED_PHRASES = [
+    "Yes?", "Done.", "Kortex is now running.", "Okay, cancelled.",
+    "Okay, I've cancelled the timer.", "There is no timer running.",
+    "I've drafted that email for you to review.", "Here is your reminder:",
+    "Alarm! It's time for your alarm.", "I'm sorry, I encountered an error."
+]
+
+# Tools whose only spoken answer is "Done.".
+SILENT_TOOLS = ('write_text', 'set_system_volume', 'set_screen_brightness')
+# Tools that Kortex answers for itself rather than reading out the tool's return value.
+APP_TOOLS = ('set_timer', 'cancel_timer', 'find_application', 'prepare_email') + SILENT_TOOLS
+
 
 class AssistantWorker(QObject):
     state_changed = pyqtSignal(int)
@@ -29,19 +54,57 @@ class AssistantWorker(QObject):
         self.config_path = config_path
         self._is_running = True
         self.stt = None
+        self.tts = None
+        self.speech = None
+        self.llm = None
+        self.router = None
+        self.tool_registry = {}
+        self.tool_executor = None
+        self.speculator = None
+        self.speculation_stable_chunks = 1
+        self.last_tool_runs = []
         self.applications = {}
         self.timer_is_active = False
+        self.heard_own_voice = False
+        self.stream_replies = True
+        # (perf_counter when the command was recognized, ms from end of speech to recognition).
+        self.command_heard_at = None
+        self.last_reply_latency_ms = None
+        # How many tool results were spoken directly instead of being summarized by the LLM.
+        self.summaries_skipped = 0
+        self.summaries_run = 0
         
         self.current_mode = "wake_word"
         self.pending_action = None
         
-        self.task_checker_timer = QTimer(self)
-        self.task_checker_timer.timeout.connect(self.check_scheduled_tasks)
+        self.wake_words = []
+        self.pipeline = None
+        self.intent_stage = None
+        self.tool_stage = None
+        self._listening = threading.Event()
+        self._listening.set()
+        
+        self.scheduler = None
+        self.interaction_started_at = None
+        self.pipeline_stats_timer = QTimer(self)
+        self.pipeline_stats_timer.timeout.connect(lambda: print(f"Pipeline: {self.pipeline.describe()}"))
 
     def stop(self):
         print("Shutdown signal received.")
         self._is_running = False
+        if self.pipeline:
+            self.pipeline.stop()
+            print(f"Pipeline: {self.pipeline.describe()}")
+        if self.scheduler:
+            self.scheduler.stop()
+            print(f"Scheduler: {self.scheduler.stats()}")
+        if self.speculator: self.speculator.cancel()
         if self.stt: self.stt.close()
+        if self.speech: self.speech.close()
+        if self.tts: self.tts.close()
+        if self.llm: self.llm.close()
+        if self.tool_executor: self.tool_executor.close()
+        tracing.close()
 
     @pyqtSlot(str)
     def handle_user_selection(self, selection):
@@ -52,168 +115,413 @@ class AssistantWorker(QObject):
             final_response = ""
             if selection:
                 if action['type'] == 'open_application':
+                    from kortex.tools import system
                     final_response = system.open_application_internal(self.applications[selection])
             else:
                 final_response = "Okay, cancelled."
             
-            self.state_changed.emit(AppState.SPEAKING)
-            self.tts.speak(final_response)
-            self.state_changed.emit(AppState.IDLE)
-            self.hide_ui_signal.emit()
-            self.current_mode = "wake_word"
+            self.speak_reply(final_response)
+            self.set_mode("wake_word")
 
     @pyqtSlot(dict)
     def handle_email_send_confirmed(self, email_details):
         self.state_changed.emit(AppState.PROCESSING)
+        from kortex.tools import communication
         result = communication.send_email_final(
             email_details['recipient'],
             email_details['subject'],
             email_details['body'],
             self.config_path
         )
-        self.state_changed.emit(AppState.SPEAKING)
-        self.tts.speak(result)
-        self.state_changed.emit(AppState.IDLE)
-        self.hide_ui_signal.emit()
-        self.current_mode = "wake_word"
+        self.speak_reply(result)
+        self.set_mode("wake_word")
 
     @pyqtSlot()
     def on_timer_finished(self):
         self.timer_is_active = False
         print("Backend notified: Timer finished.")
 
-    def check_scheduled_tasks(self):
-        reminders = database.get_due_tasks("reminders")
-        for r in reminders:
-            message = f"Here is your reminder: {r['reminder_text']}"
-            self.show_notification_signal.emit("Kortex Reminder", message)
-            self.tts.speak(message)
-            database.mark_task_triggered(r['id'], "reminders")
-
-        alarms = database.get_due_tasks("alarms")
-        for a in alarms:
-            message = f"Alarm! It's time for your alarm."
+    def speak_reply(self, text, next_state=AppState.IDLE, hide_ui=True):
+        """Queues a spoken reply; the GUI moves to next_state once it has been heard."""
+        self.state_changed.emit(AppState.SPEAKING)
+        return self.speech.say(text, PRIORITY_REPLY, on_done=self._reply_done(next_state, hide_ui))
+
+    def speak_reply_stream(self, sentences, next_state=AppState.IDLE, hide_ui=True):
+        """Like speak_reply, for sentences that are still being generated."""
+        self.state_changed.emit(AppState.SPEAKING)
+        return self.speech.say_stream(sentences, PRIORITY_REPLY, on_done=self._reply_done(next_state, hide_ui))
+
+    def _reply_done(self, next_state, hide_ui):
+        heard_at, self.command_heard_at = self.command_heard_at, None
+        interaction = tracing.current_interaction()
+
+        def on_done(request):
+            first_sample_time = self.tts.backend.first_sample_time
+            if heard_at and first_sample_time and not request.cancelled:
+                recognized_at, recognition_ms = heard_at
+                self.last_reply_latency_ms = (recognition_ms or 0.0) + 1000.0 * (first_sample_time - recognized_at)
+                print(f"End of speech to first audible word: {self.last_reply_latency_ms:.0f} ms")
+            if heard_at:
+                tracing.record("interaction", self.interaction_started_at, time.perf_counter(), interaction,
+                               reply_latency_ms=self.last_reply_latency_ms, cancelled=request.cancelled)
+            self.state_changed.emit(next_state)
+            if hide_ui: self.hide_ui_signal.emit()
+
+        return on_done
+
+    def _first_event(self, events):
+        """Reads a reply stream up to its first tool call or non-blank text, or None if it has neither."""
+        for event in events:
+            if event['type'] in ('tool_call', 'tool_calls') or (event['type'] == 'delta' and event['data'].strip()):
+                return event
+        return None
+
+    def _reply_sentences(self, first_delta, events):
+        """Cuts the rest of a streamed reply into sentences as the tokens arrive."""
+        def deltas():
+            spoken = [first_delta]
+            yield first_delta
+            for event in events:
+                if event['type'] == 'delta':
+                    spoken.append(event['data'])
+                    yield event['data']
+            print(f"Kortex: {''.join(spoken).strip()}")
+        return iter_sentences(deltas())
+
+    def start_timer(self, duration_str=''):
+        from kortex.tools import productivity
+        total_seconds = productivity.parse_duration(duration_str)
+        if total_seconds <= 0:
+            return f"Sorry, I couldn't understand the duration '{duration_str}'."
+        self.timer_started_signal.emit(total_seconds); self.timer_is_active = True
+        return f"Okay, timer set for {duration_str}."
+
+    def cancel_timer(self):
+        if not self.timer_is_active:
+            return "There is no timer running."
+        self.timer_cancelled_signal.emit(); self.timer_is_active = False
+        return "Okay, I've cancelled the timer."
+
+    def _tool_function(self, name):
+        """Returns what to call for a tool when it runs alongside others in one reply."""
+        if name == 'set_timer': return self.start_timer
+        if name == 'cancel_timer': return self.cancel_timer
+        if name == 'find_application':
+            def open_application(app_query):
+                from kortex.tools import system
+                matches = system.find_application(app_query=app_query, apps_cache=self.applications)
+                if len(matches) == 1:
+                    return system.open_application_internal(self.applications[matches[0]])
+                if matches:
+                    return f"I found several applications matching '{app_query}'; ask me again with the exact name."
+                return f"Sorry, I couldn't find an application like '{app_query}'."
+            return open_application
+        if name == 'prepare_email':
+            def prepare_email(**params):
+                self.show_email_preview_signal.emit(params)
+                return "I've drafted that email for you to review."
+            return prepare_email
+        if name in SILENT_TOOLS:
+            func = self.tool_registry[name]
+            return lambda **params: (func(**params), "Done.")[1]
+        return self.tool_registry[name]
+
+    def _tool_failure(self, run):
+        if run.timed_out:
+            return f"Sorry, the {run.tool_name.replace('_', ' ')} request took too long, so I stopped waiting for it."
+        return f"The {run.tool_name.replace('_', ' ')} request failed: {run.error}"
+
+    def run_tool_calls(self, text, calls):
+        """Runs several tool calls from one reply concurrently and answers for all of them.
+
+        Returns (final_response, reply_stream); reply_stream is set when the combined answer
+        is being summarized by the LLM.
+        """
+        runs = self.tool_executor.run_all(calls, self._tool_function)
+        self.last_tool_runs = [run.timing() for run in runs]
+        outputs = []
+        for run in runs:
+            outputs.append((run, str(run.result) if run.ok else self._tool_failure(run)))
+
+        speakable = all(
+            run.ok and (run.tool_name in APP_TOOLS or self.llm.tool_schemas.is_speakable(run.tool_name))
+            for run in runs
+        )
+        if speakable:
+            self.summaries_skipped += 1
+            return " ".join(dict.fromkeys(output for _, output in outputs)), None
+
+        self.summaries_run += 1
+        tool_outputs = "; ".join(f"{run.tool_name}: '{output}'" for run, output in outputs)
+        summary_prompt = f"Given the user's original request '{text}', provide a concise, natural language answer covering each of the following tool outputs: {tool_outputs}"
+        if self.stream_replies:
+            events = self.llm.stream_response(summary_prompt, use_tools=False)
+            first = self._first_event(events)
+            if first: return "", self._reply_sentences(first['data'], events)
+            return "Task complete.", None
+        summary = self.llm.get_response(summary_prompt, use_tools=False)
+        return summary.get('data', "Task complete."), None
+
+    def on_task_due(self, task_type, task, late):
+        """Called by the scheduler's thread when a reminder or alarm falls due."""
+        due_at = task['due_at'].strftime('%I:%M %p')
+        if task_type == "reminders":
+            reminder_text = task['reminder_text'] + (f" (missed at {due_at})" if late else "")
+            self.show_notification_signal.emit("Kortex Reminder", f"Here is your reminder: {reminder_text}")
+            self.speech.remind(reminder_text)
+        else:
+            message = f"You missed your alarm for {due_at}." if late else "Alarm! It's time for your alarm."
             self.show_notification_signal.emit("Kortex Alarm", message)
-            self.tts.speak(message)
-            database.mark_task_triggered(a['id'], "alarms")
+            self.speech.say(message, PRIORITY_ALARM)
+        database.mark_task_triggered(task['id'], task_type)
+
+    def _recognize(self):
+        """Recognition stage: decodes one chunk of audio and hands finished commands to the intent stage."""
+        if self.current_mode not in ["wake_word", "command"]:
+            # Nothing to listen for while a command is handled or the GUI waits on the user.
+            self._listening.wait(0.25)
+            if self.current_mode in ["wake_word", "command"]:
+                self.stt.discard_pending()
+            return
+
+        chunk_started_at = time.perf_counter()
+        text = self.stt.process_chunk(
+            is_wake_word_detection=(self.current_mode == "wake_word"),
+            volume_callback=self.volume_updated.emit if self.current_mode == "command" else None
+        )
+        # Audio keeps flowing while Kortex talks, but what it hears then is its own voice.
+        if self.speech.is_speaking:
+            self.heard_own_voice = True
+            return
+        if self.heard_own_voice:
+            self.stt.reset(); self.heard_own_voice = False
+            return
+        if not text:
+            if self.current_mode == "command" and self.speculator:
+                self.speculator.observe_partial(self.stt.stable_partial(self.speculation_stable_chunks))
+            return
+
+        if self.current_mode == "wake_word" and text in self.wake_words:
+            tracing.begin_interaction()
+            self.interaction_started_at = time.perf_counter()
+            tracing.record("wake_detection", chunk_started_at, self.interaction_started_at, text=text)
+            self.show_ui_signal.emit()
+            self.speak_reply("Yes?", next_state=AppState.LISTENING, hide_ui=False)
+            self.current_mode = "command"
+
+        elif self.current_mode == "command":
+            if len(text.strip().split()) <= 1:
+                if self.speculator: self.speculator.reset()
+                return
+            utterance = self.stt.last_utterance or {}
+            recognized_at = time.perf_counter()
+            recognition_ms = utterance.get('end_of_speech_to_text_ms')
+            speech_ended_at = recognized_at - recognition_ms / 1000.0 if recognition_ms is not None else recognized_at
+            tracing.record("utterance_capture", self.interaction_started_at, speech_ended_at, text=text)
+            tracing.record("stt_finalization", speech_ended_at, recognized_at, endpoint=utterance.get('endpoint'))
+            self.set_mode("processing")
+            self.intent_stage.put({'text': text, 'heard_at': (recognized_at, recognition_ms)})
+
+    def set_mode(self, mode):
+        self.current_mode = mode
+        if mode in ["wake_word", "command"]:
+            self._listening.set()
+        else:
+            self._listening.clear()
+
+    def _resolve_intent(self, command):
+        """Intent stage: decides what a command means, via the router, the decision cache or the LLM."""
+        text = command['text']
+        self.state_changed.emit(AppState.PROCESSING)
+        self.command_heard_at = command['heard_at']
+        reply_stream = None
+        llm_response = self.router.route(text)
+        speculative_events = None
+        if self.speculator:
+            if llm_response is None: speculative_events = self.speculator.commit(text)
+            else: self.speculator.reset()
+        if llm_response is None and self.stream_replies:
+            events = speculative_events or self.llm.stream_response(text)
+            llm_response = self._first_event(events)
+            if llm_response is None:
+                llm_response = {'type': 'text', 'data': "I'm not sure how to respond."}
+            elif llm_response['type'] == 'delta':
+                reply_stream = self._reply_sentences(llm_response['data'], events)
+                llm_response = {'type': 'text'}
+            else:
+                # Let the stream finish so its timings are recorded.
+                for _ in events: pass
+        elif llm_response is None:
+            llm_response = self.llm.get_response(text)
+
+        if llm_response['type'] in ('tool_call', 'tool_calls'):
+            command['response'] = llm_response
+            self.tool_stage.put(command)
+        else:
+            self._finish_command(llm_response.get('data', "I'm not sure how to respond."), reply_stream)
+
+    def _execute_tools(self, command):
+        """Tool stage: runs the tools a command asked for and works out what to say."""
+        text = command['text']
+        llm_response = command['response']
+        tool_registry = self.tool_registry
+        final_response = ""
+        reply_stream = None
+
+        if llm_response['type'] == 'tool_calls':
+            final_response, reply_stream = self.run_tool_calls(text, llm_response['data'])
+            self._finish_command(final_response, reply_stream)
+            return
+
+        data = llm_response['data']; name = data.get('tool_name'); params = data.get('parameters', {})
+
+        if name == 'find_application':
+            from kortex.tools import system
+            matches = system.find_application(app_query=params.get('app_query'), apps_cache=self.applications)
+            if len(matches) == 1:
+                final_response = system.open_application_internal(self.applications[matches[0]])
+            elif len(matches) > 1:
+                self.state_changed.emit(AppState.AWAITING_SELECTION)
+                self.show_selection_signal.emit(matches)
+                self.set_mode("awaiting_selection")
+                self.pending_action = {'type': 'open_application', 'matches': matches}
+                self.command_heard_at = None
+                return
+            else:
+                final_response = f"Sorry, I couldn't find an application like '{params.get('app_query')}'."
+
+        elif name == 'prepare_email':
+            self.show_email_preview_signal.emit(params)
+            final_response = "I've drafted that email for you to review."
+            self.set_mode("awaiting_input")
+
+        elif name == 'set_timer':
+            final_response = self.start_timer(params.get('duration_str', ''))
+
+        elif name == 'cancel_timer':
+            final_response = self.cancel_timer()
+
+        elif name in tool_registry:
+            run = self.tool_executor.run(name, params, self._tool_function)
+            self.last_tool_runs = [run.timing()]
+            result = run.result
+            if not run.ok:
+                final_response = self._tool_failure(run)
+            elif name in SILENT_TOOLS:
+                final_response = result
+            elif self.llm.tool_schemas.is_speakable(name) and isinstance(result, str) and result:
+                final_response = result
+                self.summaries_skipped += 1
+                print(f"Spoke {name} result directly ({self.summaries_skipped} summaries skipped, "
+                      f"{self.summaries_run} run).")
+            else:
+                self.summaries_run += 1
+                summary_prompt = f"Given the user's original request '{text}', provide a concise, natural language answer based on the following tool output: '{result}'"
+                if self.stream_replies:
+                    events = self.llm.stream_response(summary_prompt, use_tools=False)
+                    first = self._first_event(events)
+                    if first: reply_stream = self._reply_sentences(first['data'], events)
+                    else: final_response = "Task complete."
+                else:
+                    summary = self.llm.get_response(summary_prompt, use_tools=False)
+                    final_response = summary.get('data', "Task complete.")
+
+        else: final_response = f"Tool '{name}' not found."
+
+        self._finish_command(final_response, reply_stream)
+
+    def _finish_command(self, final_response, reply_stream=None):
+        """Hands the answer to the speech stage and goes back to listening for the wake word."""
+        if self.current_mode == "awaiting_input":
+            return
+        if reply_stream is not None: self.speak_reply_stream(reply_stream)
+        else: self.speak_reply(final_response)
+        self.set_mode("wake_word")
+
+    def _on_stage_error(self, stage, command, error):
+        print(f"Dropped command '{command['text']}' after the {stage.name} stage failed: {error}")
+        # The command is over, so it must not leave a latency start or a speculation behind.
+        self.command_heard_at = None
+        if self.speculator:
+            self.speculator.reset()
+        self.speak_reply("I'm sorry, I encountered an error.")
+        self.set_mode("wake_word")
 
     def run(self):
         pythoncom.CoInitialize()
         try:
+            startup_profile.mark("imports and GUI")
             database.init_db()
+            from kortex.tools import system
             self.applications = system.scan_applications()
+            startup_profile.mark("database and application scan")
             with open(self.config_path, 'r') as f: config = yaml.safe_load(f)
-            wake_words = config['wake_words']
+            tracing.configure(config)
+            self.wake_words = config['wake_words']
+            self.stream_replies = config.get('llm', {}).get('stream_replies', True)
+            pipeline_config = config.get('pipeline', {})
             
-            tool_registry = {
-                "search_web": web.search_web, "get_weather": web.get_weather, "find_location": web.find_location,
-                "convert_currency": web.convert_currency,
-                "open_website": system.open_website, "create_folder": system.create_folder,
-                "find_application": system.find_application, "set_system_volume": system.set_system_volume,
-                "set_screen_brightness": system.set_screen_brightness,
-                "set_timer": productivity.set_timer, "cancel_timer": productivity.cancel_timer,
-                "write_text": productivity.write_text, "get_current_time": productivity.get_current_time,
-                "get_current_date": productivity.get_current_date, "calculate_future_date": productivity.calculate_future_date,
-                "calculate_days_between": productivity.calculate_days_between,
-                "calculate": productivity.calculate, "convert_units": productivity.convert_units,
-                "tell_joke": productivity.tell_joke, "flip_coin": productivity.flip_coin,
-                "create_note": productivity.create_note, "read_notes": productivity.read_notes,
-                "set_reminder": productivity.set_reminder, "set_alarm": productivity.set_alarm,
-                "prepare_email": communication.prepare_email
-            }
+            tool_registry = self.tool_registry = build_tool_registry()
             
+            # Load the LLM in the background while the speech engines start up.
+            self.llm = LLMClient(tool_registry, self.config_path)
+            if config.get('llm', {}).get('warmup', True): self.llm.start_warmup()
+            tools_config = config.get('tools', {})
+            self.tool_executor = ToolExecutor(
+                tools_config.get('max_workers', 4), tools_config.get('timeout_seconds', 10),
+                thread_init=pythoncom.CoInitialize, tool_schemas=self.llm.tool_schemas,
+                process_workers=tools_config.get('process_workers', 1),
+                memory_limit_mb=tools_config.get('memory_limit_mb', 512)
+            )
+            self.router = IntentRouter(tool_registry, self.config_path, tool_schemas=self.llm.tool_schemas)
+            startup_profile.mark("LLM client, tool schemas and executor")
+            speculation_config = config.get('llm', {}).get('speculation', {})
+            # Speculative requests hand over their event stream, so they need streamed replies.
+            if self.stream_replies and speculation_config.get('enabled', True):
+                self.speculation_stable_chunks = speculation_config.get('stable_chunks', 1)
+                self.speculator = Speculator(
+                    self.llm, self.router,
+                    max_per_utterance=speculation_config.get('max_per_utterance', 2),
+                    waste_budget_seconds=speculation_config.get('waste_budget_seconds', 10),
+                    waste_window_seconds=speculation_config.get('waste_window_seconds', 60)
+                )
             self.stt = SpeechToText(self.config_path)
+            startup_profile.mark("speech recognition")
             self.tts = TextToSpeech(self.config_path)
-            self.llm = LLMClient(tool_registry, self.config_path)
-            self.task_checker_timer.start(30000)
-            self.tts.speak("Kortex is now running.")
-            
-            while self._is_running:
-                if self.current_mode in ["wake_word", "command"]:
-                    text = self.stt.process_chunk(
-                        is_wake_word_detection=(self.current_mode == "wake_word"),
-                        volume_callback=self.volume_updated.emit if self.current_mode == "command" else None
-                    )
-                    if not text:
-                        QThread.msleep(10)
-                        continue
-
-                    if self.current_mode == "wake_word" and text in wake_words:
-                        self.show_ui_signal.emit()
-                        self.state_changed.emit(AppState.SPEAKING); self.tts.speak("Yes?")
-                        self.state_changed.emit(AppState.LISTENING); self.current_mode = "command"
-                    
-                    elif self.current_mode == "command":
-                        if len(text.strip().split()) <= 1: continue
-
-                        self.state_changed.emit(AppState.PROCESSING)
-                        llm_response = self.llm.get_response(text)
-                        final_response = ""
-                        
-                        if llm_response['type'] == 'tool_call':
-                            data = llm_response['data']; name = data.get('tool_name'); params = data.get('parameters', {})
-                            
-                            if name == 'find_application':
-                                matches = system.find_application(app_query=params.get('app_query'), apps_cache=self.applications)
-                                if len(matches) == 1:
-                                    final_response = system.open_application_internal(self.applications[matches[0]])
-                                elif len(matches) > 1:
-                                    self.state_changed.emit(AppState.AWAITING_SELECTION)
-                                    self.show_selection_signal.emit(matches)
-                                    self.current_mode = "awaiting_selection"
-                                    self.pending_action = {'type': 'open_application', 'matches': matches}
-                                    continue
-                                else:
-                                    final_response = f"Sorry, I couldn't find an application like '{params.get('app_query')}'."
-                            
-                            elif name == 'prepare_email':
-                                self.show_email_preview_signal.emit(params)
-                                final_response = "I've drafted that email for you to review."
-                                self.current_mode = "awaiting_input"
-
-                            elif name == 'set_timer':
-                                duration_str = params.get('duration_str', '')
-                                total_seconds = productivity.parse_duration(duration_str)
-                                if total_seconds > 0:
-                                    self.timer_started_signal.emit(total_seconds); self.timer_is_active = True
-                                    final_response = f"Okay, timer set for {duration_str}."
-                                else: final_response = f"Sorry, I couldn't understand the duration '{duration_str}'."
-                            
-                            elif name == 'cancel_timer':
-                                if self.timer_is_active:
-                                    self.timer_cancelled_signal.emit(); self.timer_is_active = False
-                                    final_response = "Okay, I've cancelled the timer."
-                                else: final_response = "There is no timer running."
-
-                            elif name in ['write_text', 'set_system_volume', 'set_screen_brightness']:
-                                tool_registry[name](**params)
-                                final_response = "Done."
-                            
-                            elif name in tool_registry:
-                                result = tool_registry[name](**params)
-                                summary_prompt = f"Given the user's original request '{text}', provide a concise, natural language answer based on the following tool output: '{result}'"
-                                summary = self.llm.get_response(summary_prompt, use_tools=False)
-                                final_response = summary.get('data', "Task complete.")
-                            
-                            else: final_response = f"Tool '{name}' not found."
-                        
-                        else:
-                            final_response = llm_response.get('data', "I'm not sure how to respond.")
-                        
-                        if self.current_mode != "awaiting_input":
-                            self.state_changed.emit(AppState.SPEAKING); self.tts.speak(final_response)
-                            self.state_changed.emit(AppState.IDLE); self.hide_ui_signal.emit()
-                            self.current_mode = "wake_word"
+            self.tts.warmup(CACHED_PHRASES)
+            self.speech = SpeechScheduler(self.tts)
+            startup_profile.mark("text to speech and phrase cache")
 
-                else:
-                    QThread.msleep(100)
+            # capture -> recognition -> intent -> tools -> speech. Capture (the audio callback and
+            # its ring buffer) and speech (the scheduler) already run on their own threads.
+            queue_size = pipeline_config.get('queue_size', 4)
+            self.pipeline = Pipeline()
+            self.pipeline.add(SourceStage("recognition", self._recognize, depth=lambda: self.stt.source.backlog))
+            self.intent_stage = self.pipeline.add(Stage("intent", self._resolve_intent, queue_size, self._on_stage_error))
+            self.tool_stage = self.pipeline.add(Stage(
+                "tools", self._execute_tools, queue_size, self._on_stage_error,
+                thread_init=pythoncom.CoInitialize, thread_exit=pythoncom.CoUninitialize
+            ))
+            self.pipeline.observe("speech", lambda: self.speech.pending)
+            self.pipeline.start()
+            stats_interval = pipeline_config.get('stats_interval_seconds', 0)
+            if stats_interval:
+                self.pipeline_stats_timer.start(int(stats_interval * 1000))
 
+            scheduler_config = config.get('scheduler', {})
+            self.scheduler = TaskScheduler(
+                self.on_task_due,
+                max_sleep_seconds=scheduler_config.get('max_sleep_seconds', 60),
+                late_after_seconds=scheduler_config.get('late_after_seconds', 60)
+            )
+            self.scheduler.start()
+            self.speech.say("Kortex is now running.",
+                            on_start=lambda request: startup_profile.report("Kortex is now running."))
         except (IOError, AttributeError) as e:
-            print(f"Main loop interrupted: {e}")
-        finally:
-            pythoncom.CoUninitialize()
-        
-        print("Worker thread has finished.")
+            print(f"Startup interrupted: {e}")
+        # Returning hands this thread back to its Qt event loop, which now delivers the GUI's
+        # signals and timers to the worker while the pipeline stages run on their own threads.
+        # COM stays initialized for those slots and is released when the thread finishes.
 
 
 def start_assistant():
@@ -250,7 +558,9 @@ def start_assistant():
         print("Shutdown complete.")
 
     app.aboutToQuit.connect(clean_shutdown)
-    thread.started.connect(worker.run); thread.start()
+    thread.started.connect(worker.run)
+    thread.finished.connect(pythoncom.CoUninitialize, Qt.DirectConnection)
+    thread.start()
     app.exec_()
 
     if restart_manager['should_restart']:
@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import ollama
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class OllamaClient:
+    """One keep-alive connection pool to Ollama, shared by everything in the process.
+
+    Wraps ollama.Client with a configurable host, separate connect and read timeouts, and a
+    bounded number of retries with exponential backoff. A request is retried only when it never
+    got going: connection failures, timeouts while connecting, and 5xx answers. A stream is
+    never retried once its first chunk has arrived.
+    """
+
+    def __init__(self, host=None, connect_timeout=2.0, read_timeout=120.0, retries=2, backoff=0.25, max_connections=4):
+        self.host = host
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_count = 0
+        self._local = threading.local()
+        transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                keepalive_expiry=300)
+        )
+        self.client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=transport,
+            event_hooks={'response': [self._on_response]}
+        )
+
+    def _on_response(self, response):
+        on_response = getattr(self._local, 'on_response', None)
+        if on_response is not None:
+            on_response(response)
+
+    @contextmanager
+    def watch_responses(self, on_response):
+        """Calls on_response(httpx.Response) for every response this thread gets inside the block.
+
+        Passing that response to abort() from another thread ends a stream without waiting for
+        its next chunk.
+        """
+        previous, self._local.on_response = getattr(self._local, 'on_response', None), on_response
+        try:
+            yield
+        finally:
+            self._local.on_response = previous
+
+    @staticmethod
+    def _is_retryable(error):
+        # ollama.Client reports a refused connection as the built-in ConnectionError.
+        if isinstance(error, (ConnectionError, httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)):
+            return True
+        return isinstance(error, ollama.ResponseError) and error.status_code >= 500
+
+    def _call(self, func, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(**kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not self._is_retryable(e):
+                    raise
+                attempt += 1
+                self.retry_count += 1
+                print(f"Ollama request failed ({e}); retry {attempt} of {self.retries}.")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def _stream(self, func, **kwargs):
+        attempt = 0
+        while True:
+            chunks = self._call(func, **kwargs)
+            try:
+                first = next(chunks)
+            except StopIteration:
+                return
+            except Exception as e:
+                if attempt >= self.retries or not self._is_retryable(e):
+                    raise
+                attempt += 1
+                self.retry_count += 1
+                print(f"Ollama stream failed to start ({e}); retry {attempt} of {self.retries}.")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                continue
+            yield first
+            yield from chunks
+            return
+
+    @staticmethod
+    def abort(response):
+        """Closes a response from any thread; a read blocked on it fails immediately."""
+        stream = response.extensions.get('network_stream')
+        sock = stream.get_extra_info('socket') if stream is not None else None
+        if sock is not None:
+            try:
+                # Closing alone would not wake a thread blocked in recv() until more data arrived.
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        response.close()
+
+    def chat(self, **kwargs):
+        if kwargs.get('stream'):
+            return self._stream(self.client.chat, **kwargs)
+        return self._call(self.client.chat, **kwargs)
+
+    def generate(self, **kwargs):
+        if kwargs.get('stream'):
+            return self._stream(self.client.generate, **kwargs)
+        return self._call(self.client.generate, **kwargs)
+
+    def list(self):
+        return self._call(self.client.list)
+
+    def close(self):
+        """Closes the connection pool; only for clients not shared through get_client()."""
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def get_client(config=None):
+    """Returns the shared client for the `ollama:` section of a loaded config."""
+    settings = (config or {}).get('ollama') or {}
+    key = (
+        settings.get('host'),
+        settings.get('connect_timeout', 2.0),
+        settings.get('read_timeout', 120.0),
+        settings.get('retries', 2),
+    )
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OllamaClient(
+                host=key[0], connect_timeout=key[1], read_timeout=key[2], retries=key[3],
+                backoff=settings.get('retry_backoff', 0.25),
+                max_connections=settings.get('max_connections', 4)
+            )
+        return _clients[key]
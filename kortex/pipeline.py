@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+
+from kortex import tracing
+from kortex.stats import percentile
+
+_STOP = object()
+
+
+class Stage:
+    """A pipeline stage: one thread taking items from a bounded queue and handling them in order.
+
+    put() blocks while the queue is full, so a slow stage pushes back on the one before it
+    instead of letting work pile up. The thread sleeps in queue.get() when there is nothing to do.
+    """
+
+    def __init__(self, name, handler, maxsize=4, on_error=None, thread_init=None, thread_exit=None):
+        self.name = name
+        self.handler = handler
+        self.on_error = on_error
+        self.thread_init = thread_init
+        self.thread_exit = thread_exit
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.processed = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.busy = False
+        self._wait_ms = deque(maxlen=200)
+        self._service_ms = deque(maxlen=200)
+        self._thread = threading.Thread(target=self._run, name=f"kortex-{name}", daemon=True)
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def start(self):
+        self._thread.start()
+
+    def put(self, item, timeout=None):
+        """Queues item for this stage; returns False if the queue stayed full for timeout seconds."""
+        try:
+            # The item keeps the interaction it was queued in; _run restores it while handling it.
+            self.queue.put((time.perf_counter(), tracing.current_interaction(), item), timeout=timeout)
+        except queue.Full:
+            return False
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    def _run(self):
+        if self.thread_init:
+            self.thread_init()
+        try:
+            while True:
+                entry = self.queue.get()
+                if entry is _STOP:
+                    return
+                queued_at, interaction, item = entry
+                start = time.perf_counter()
+                self._wait_ms.append(1000.0 * (start - queued_at))
+                self.busy = True
+                try:
+                    with tracing.in_interaction(interaction):
+                        self.handler(item)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Error in {self.name} stage: {e}")
+                    print(traceback.format_exc(), end="")
+                    if self.on_error:
+                        self.on_error(self, item, e)
+                finally:
+                    end = time.perf_counter()
+                    self.busy = False
+                    self.processed += 1
+                    self._service_ms.append(1000.0 * (end - start))
+                    tracing.record(f"stage.{self.name}", start, end, interaction, queued_ms=self._wait_ms[-1])
+        finally:
+            if self.thread_exit:
+                self.thread_exit()
+
+    def stop(self, timeout=2):
+        # The stop marker jumps no queue; whatever is already waiting is handled first.
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "busy": self.busy,
+            "processed": self.processed,
+            "errors": self.errors,
+            "wait_ms_p50": percentile(self._wait_ms, 0.5),
+            "wait_ms_p95": percentile(self._wait_ms, 0.95),
+            "service_ms_p50": percentile(self._service_ms, 0.5),
+            "service_ms_p95": percentile(self._service_ms, 0.95),
+        }
+
+
+class SourceStage:
+    """The head of a pipeline: calls step() in a loop on its own thread.
+
+    step() is expected to block on its input (e.g. waiting for audio) rather than spin. depth()
+    reports the backlog of that input, such as the frames waiting in the capture ring buffer.
+    """
+
+    def __init__(self, name, step, depth=None):
+        self.name = name
+        self.step = step
+        self._depth = depth
+        self.processed = 0
+        self.max_depth = 0
+        self._service_ms = deque(maxlen=200)
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"kortex-{name}", daemon=True)
+
+    @property
+    def depth(self):
+        return self._depth() if self._depth else 0
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def _run(self):
+        while self._running.is_set():
+            start = time.perf_counter()
+            try:
+                self.step()
+            except Exception as e:
+                if self._running.is_set():
+                    print(f"{self.name.capitalize()} stage stopped: {e}")
+                    print(traceback.format_exc(), end="")
+                return
+            self.processed += 1
+            self._service_ms.append(1000.0 * (time.perf_counter() - start))
+            self.max_depth = max(self.max_depth, self.depth)
+
+    def stop(self, timeout=2):
+        self._running.clear()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "service_ms_p50": percentile(self._service_ms, 0.5),
+            "service_ms_p95": percentile(self._service_ms, 0.95),
+        }
+
+
+class Pipeline:
+    """Stages in order, started head-first and stopped head-first so nothing new flows in while draining.
+
+    Components that already own a thread and a queue (audio capture, the speech scheduler) can be
+    registered with observe() so their queue depth shows up in stats() too.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self._observed = {}
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def observe(self, name, depth):
+        self._observed[name] = depth
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def stats(self):
+        stats = {name: {"depth": depth()} for name, depth in self._observed.items()}
+        stats.update({stage.name: stage.stats() for stage in self.stages})
+        return stats
+
+    def describe(self):
+        parts = []
+        for name, stats in self.stats().items():
+            part = f"{name}: depth {stats['depth']}"
+            if stats.get('service_ms_p50') is not None:
+                part += f", p50 {stats['service_ms_p50']:.0f} ms / p95 {stats['service_ms_p95']:.0f} ms"
+            if stats.get('wait_ms_p50') is not None:
+                part += f", queued p50 {stats['wait_ms_p50']:.0f} ms / p95 {stats['wait_ms_p95']:.0f} ms"
+            parts.append(part)
+        return "; ".join(parts)
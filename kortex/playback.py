@@ -0,0 +1,175 @@
+import io
+import threading
+import time
+import wave
+
+
+class PlaybackBackend:
+    """Plays 16-bit mono PCM as it arrives.
+
+    Callers stream chunks with write(), call end_sentence() after each sentence's audio, call
+    finish() at the end of an utterance to wait until it has been heard, and may call stop() from
+    another thread to cut playback short.
+    first_sample_time is the perf_counter() time at which the first chunk reached the device.
+    """
+
+    def __init__(self):
+        self.first_sample_time = None
+        self._stopped = threading.Event()
+
+    def write(self, pcm, sample_rate):
+        raise NotImplementedError
+
+    def end_sentence(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def play(self, pcm, sample_rate):
+        self.write(pcm, sample_rate)
+        self.finish()
+
+    def reset(self):
+        """Prepares for a new utterance: clears the stop flag and the first-sample timestamp."""
+        self.first_sample_time = None
+        self._stopped.clear()
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        pass
+
+
+class PyAudioPlayback(PlaybackBackend):
+    """Writes PCM straight into a PortAudio output stream, reopened only when the sample rate changes."""
+
+    def __init__(self, buffer_frames=1024):
+        super().__init__()
+        import pyaudio
+        self.buffer_frames = buffer_frames
+        self.p = pyaudio.PyAudio()
+        self._format = pyaudio.paInt16
+        self.stream = None
+        self.sample_rate = None
+        self._remainder = b""
+
+    def _ensure_stream(self, sample_rate):
+        if self.stream is not None and self.sample_rate == sample_rate:
+            if not self.stream.is_active():
+                self.stream.start_stream()
+            return
+        self.close_stream()
+        self.stream = self.p.open(
+            format=self._format, channels=1, rate=sample_rate,
+            output=True, frames_per_buffer=self.buffer_frames
+        )
+        self.sample_rate = sample_rate
+
+    def write(self, pcm, sample_rate):
+        if self._stopped.is_set():
+            return
+        self._ensure_stream(sample_rate)
+        # Piper's stdout is read in arbitrary byte chunks; keep a half sample for the next write.
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+
+        step = self.buffer_frames * 2
+        for offset in range(0, usable, step):
+            if self._stopped.is_set():
+                return
+            if self.first_sample_time is None:
+                self.first_sample_time = time.perf_counter() + self.stream.get_output_latency()
+            self.stream.write(pcm[offset:min(offset + step, usable)])
+
+    def finish(self):
+        self._remainder = b""
+        if self.stream is not None and self.stream.is_active():
+            # Pa_StopStream returns once the queued buffers have been played.
+            self.stream.stop_stream()
+
+    def close_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        self.close_stream()
+        self.p.terminate()
+
+
+class WinsoundPlayback(PlaybackBackend):
+    """Windows-only fallback: buffers each sentence and plays it from memory with winsound.
+
+    winsound can only play a complete sound, so a sentence starts once all of its audio has been
+    synthesized; the next sentence is synthesized while this one plays.
+    """
+
+    def __init__(self):
+        super().__init__()
+        import winsound
+        self.winsound = winsound
+        self._chunks = []
+        self.sample_rate = None
+
+    def write(self, pcm, sample_rate):
+        self._chunks.append(pcm)
+        self.sample_rate = sample_rate
+
+    def end_sentence(self):
+        self.finish()
+
+    def finish(self):
+        pcm, self._chunks = b"".join(self._chunks), []
+        if not pcm or self._stopped.is_set():
+            return
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(pcm)
+        if self.first_sample_time is None:
+            self.first_sample_time = time.perf_counter()
+        self.winsound.PlaySound(buffer.getvalue(), self.winsound.SND_MEMORY | self.winsound.SND_NODEFAULT)
+
+    def stop(self):
+        super().stop()
+        self._chunks = []
+        self.winsound.PlaySound(None, self.winsound.SND_PURGE)
+
+
+class NullPlayback(PlaybackBackend):
+    """Discards audio, keeping a copy in `captured`; used for headless tests and benchmarks.
+
+    With realtime=True, write() sleeps for the duration of the audio like a real device would.
+    """
+
+    def __init__(self, realtime=False):
+        super().__init__()
+        self.realtime = realtime
+        self.captured = bytearray()
+        self.sample_rate = None
+
+    def write(self, pcm, sample_rate):
+        if self._stopped.is_set():
+            return
+        if self.first_sample_time is None:
+            self.first_sample_time = time.perf_counter()
+        self.sample_rate = sample_rate
+        self.captured.extend(pcm)
+        if self.realtime:
+            self._stopped.wait(len(pcm) / 2 / sample_rate)
+
+
+def create_backend(playback_config):
+    backend = playback_config.get('backend', 'pyaudio')
+    if backend == 'pyaudio':
+        return PyAudioPlayback(buffer_frames=playback_config.get('buffer_frames', 1024))
+    if backend == 'winsound':
+        return WinsoundPlayback()
+    if backend == 'null':
+        return NullPlayback(realtime=playback_config.get('realtime', False))
+    raise ValueError(f"Unknown playback backend '{backend}'.")
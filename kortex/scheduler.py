@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import threading
+from collections import deque
+from datetime import datetime
+
+from kortex import database
+from kortex.stats import percentile
+
+TASK_TYPES = ("reminders", "alarms")
+
+
+class TaskScheduler:
+    """Fires reminders and alarms when they fall due, from a min-heap ordered by due_at.
+
+    Pending tasks are loaded from the database once at start. Tasks added later arrive through
+    database.add_task_listener, so nothing polls the database. The thread sleeps until the
+    earliest task is due. It also wakes at least every max_sleep_seconds, because due_at is
+    wall-clock time: that wall-clock check catches suspend, resume and clock changes, and it
+    costs no query.
+
+    Tasks that came due while Kortex was closed or the machine was asleep fire on the next check,
+    with late=True so the announcement can say they were missed. Firing jitter, meaning how long
+    after due_at a task actually fired, is kept for stats().
+    """
+
+    def __init__(self, on_due, max_sleep_seconds=60.0, late_after_seconds=60.0):
+        self.on_due = on_due
+        self.max_sleep = max_sleep_seconds
+        self.late_after = late_after_seconds
+        self._heap = []
+        self._sequence = itertools.count()
+        self._scheduled = set()
+        self._condition = threading.Condition()
+        self._running = False
+        self._jitter_ms = deque(maxlen=200)
+        self.fired = 0
+        self.caught_up = 0
+        self._thread = threading.Thread(target=self._run, name="kortex-scheduler", daemon=True)
+
+    def start(self):
+        for task_type in TASK_TYPES:
+            for task in database.get_pending_tasks(task_type):
+                self.add(task_type, task)
+        database.add_task_listener(self.add)
+        self._running = True
+        self._thread.start()
+
+    def add(self, task_type, task):
+        """Schedules a task row ({'id', 'due_at', ...}); a task already scheduled is ignored."""
+        with self._condition:
+            if (task_type, task['id']) in self._scheduled:
+                return
+            self._scheduled.add((task_type, task['id']))
+            heapq.heappush(self._heap, (task['due_at'], next(self._sequence), task_type, task))
+            # Only a new earliest task changes how long the thread should sleep.
+            if self._heap[0][3] is task:
+                self._condition.notify()
+
+    @property
+    def pending(self):
+        with self._condition:
+            return len(self._heap)
+
+    def next_due(self):
+        with self._condition:
+            return self._heap[0][0] if self._heap else None
+
+    def _take_due(self):
+        with self._condition:
+            while self._running:
+                now = datetime.now()
+                if self._heap and self._heap[0][0] <= now:
+                    due_at, _, task_type, task = heapq.heappop(self._heap)
+                    self._scheduled.discard((task_type, task['id']))
+                    return task_type, task, (now - due_at).total_seconds()
+                timeout = self.max_sleep
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._condition.wait(timeout)
+            return None
+
+    def _run(self):
+        while True:
+            due = self._take_due()
+            if due is None:
+                return
+            task_type, task, lateness = due
+            late = lateness > self.late_after
+            self.fired += 1
+            if late:
+                self.caught_up += 1
+            else:
+                self._jitter_ms.append(1000.0 * lateness)
+            print(f"Firing {task_type[:-1]} {task['id']} due at {task['due_at']:%H:%M:%S} "
+                  f"({1000.0 * lateness:.0f} ms {'late, missed' if late else 'after due'}).")
+            try:
+                self.on_due(task_type, task, late)
+            except Exception as e:
+                print(f"Error while firing {task_type[:-1]} {task['id']}: {e}")
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "fired": self.fired,
+            "caught_up": self.caught_up,
+            "jitter_ms_p50": percentile(self._jitter_ms, 0.5),
+            "jitter_ms_p95": percentile(self._jitter_ms, 0.95),
+            "jitter_ms_max": max(self._jitter_ms) if self._jitter_ms else None,
+        }
+
+    def stop(self):
+        database.remove_task_listener(self.add)
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
@@ -5,7 +5,7 @@ import math
 import requests
 import zipfile
 import shutil
-import ollama
+from kortex.ollama_client import OllamaClient
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, 
                              QStackedWidget, QPushButton, QComboBox, QSplitter,
                              QListWidgetItem, QFrame, QProgressBar, QGroupBox,
@@ -287,12 +287,15 @@ class SettingsWindow(QWidget):
 
     def populate_ollama_models(self):
         try:
-            client = ollama.Client(timeout=5); models_data = client.list().get('models', []); model_names = [m.get('name') for m in models_data if m.get('name')]
+            # Runs on the GUI thread: use a short timeout and no retries instead of the assistant's client.
+            with OllamaClient(host=(self.config.get('ollama') or {}).get('host'), connect_timeout=2.0, read_timeout=5.0, retries=0) as client:
+                models_data = client.list().get('models', [])
+            model_names = [m.get('model') or m.get('name') for m in models_data if m.get('model') or m.get('name')]
             self.ollama_model_combo.clear(); self.ollama_model_combo.addItems(model_names)
             current_model = self.config.get('ollama_model')
             if current_model in model_names: self.ollama_model_combo.setCurrentText(current_model)
             self._set_status_label(self.llm_status_label, "Ollama connection successful.", "success")
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, ConnectionError):
             self._set_status_label(self.llm_status_label, "Could not connect to Ollama. Please ensure it is running.", "error")
         except Exception as e:
             self._set_status_label(self.llm_status_label, f"An Ollama error occurred: {e}", "error")
@@ -0,0 +1,195 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from kortex import tracing
+from kortex.intent_router import normalize
+
+
+class Speculation:
+    """One background LLM request started from a partial transcript."""
+
+    def __init__(self, llm, transcript, on_wasted=None):
+        self.transcript = transcript
+        self.key = normalize(transcript)
+        self.on_wasted = on_wasted
+        self.interaction = tracing.current_interaction()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.cancelled = threading.Event()
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._client = llm.client
+        self._response = None
+        self._waste_reported = False
+        self._thread = threading.Thread(target=self._run, args=(llm,), daemon=True)
+        self._thread.start()
+
+    def _run(self, llm):
+        events = llm.stream_response(self.transcript)
+        try:
+            with tracing.in_interaction(self.interaction), llm.client.watch_responses(self._set_response):
+                for event in events:
+                    if self.cancelled.is_set():
+                        break
+                    self._events.put(event)
+        finally:
+            # Closing the stream drops the HTTP connection, which stops Ollama generating.
+            events.close()
+            self.finished_at = time.perf_counter()
+            self._events.put(None)
+            if self.cancelled.is_set():
+                self._report_waste()
+
+    def _set_response(self, response):
+        with self._lock:
+            self._response = response
+        if self.cancelled.is_set():
+            self._client.abort(response)
+
+    def cancel(self):
+        """Stops the request now: aborting the HTTP response ends the stream mid-chunk."""
+        self.cancelled.set()
+        with self._lock:
+            response = self._response
+        if response is not None:
+            try:
+                self._client.abort(response)
+            except Exception as e:
+                print(f"Error while closing a speculative LLM request: {e}")
+        if self.finished_at is not None:
+            self._report_waste()
+
+    def _report_waste(self):
+        # Called from _run once the request has really stopped, or from cancel() if it had
+        # already finished; whichever comes second does nothing.
+        with self._lock:
+            if self._waste_reported:
+                return
+            self._waste_reported = True
+        if self.on_wasted is not None:
+            self.on_wasted(self.elapsed_ms())
+
+    def events(self):
+        """Yields the request's events, including ones that arrive after this is called."""
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            yield event
+
+    def elapsed_ms(self):
+        end = self.finished_at or time.perf_counter()
+        return 1000.0 * (end - self.started_at)
+
+
+class Speculator:
+    """Starts the LLM request for a command before the user has finished saying it.
+
+    Once the partial hypothesis has been stable for a while, its LLM request runs in the
+    background. If the final transcript normalizes to the same text, that request is committed
+    and its events are used as-is; otherwise it is cancelled. Even a cancelled request leaves
+    the system prompt and tools in Ollama's prompt cache. Speculation never runs tools.
+
+    Wasted work is capped: once cancelled requests have used waste_budget_seconds of LLM time
+    within the last waste_window_seconds, no new speculation starts until the window moves on.
+    """
+
+    def __init__(self, llm, router=None, max_per_utterance=2, waste_budget_seconds=10.0, waste_window_seconds=60.0):
+        self.llm = llm
+        self.router = router
+        self.max_per_utterance = max_per_utterance
+        self.waste_budget_ms = 1000.0 * waste_budget_seconds
+        self.waste_window = waste_window_seconds
+        self.current = None
+        self._started_this_utterance = 0
+        self._waste = deque()
+        self._waste_lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped_for_budget = 0
+        self.saved_ms = 0.0
+        self.wasted_ms = 0.0
+
+    def _recent_waste_ms(self):
+        cutoff = time.perf_counter() - self.waste_window
+        with self._waste_lock:
+            while self._waste and self._waste[0][0] < cutoff:
+                self._waste.popleft()
+            return sum(ms for _, ms in self._waste)
+
+    def observe_partial(self, partial):
+        """Speculates on a stable partial transcript unless it is already being worked on."""
+        if not partial or len(partial.split()) <= 1:
+            return
+        if self.current is not None and self.current.key == normalize(partial):
+            return
+        if self.router is not None and self.router.route(partial, record=False):
+            return
+        if self._started_this_utterance >= self.max_per_utterance:
+            return
+        if self._recent_waste_ms() >= self.waste_budget_ms:
+            self.skipped_for_budget += 1
+            return
+        self.cancel()
+        print(f"Speculating on partial transcript: '{partial}'")
+        self.current = Speculation(self.llm, partial, on_wasted=self._record_waste)
+        self._started_this_utterance += 1
+        self.started += 1
+
+    def commit(self, transcript):
+        """Returns the events of a speculation matching the final transcript, or None.
+
+        Either way the utterance is over: a non-matching speculation is cancelled.
+        """
+        speculation, self.current = self.current, None
+        started_this_utterance, self._started_this_utterance = self._started_this_utterance, 0
+        if speculation is not None and speculation.key == normalize(transcript):
+            saved_ms = speculation.elapsed_ms()
+            self.hits += 1
+            self.saved_ms += saved_ms
+            print(f"Speculation hit: the LLM request was already {saved_ms:.0f} ms in "
+                  f"(hit rate {self.hit_rate:.0%}).")
+            return speculation.events()
+        if started_this_utterance:
+            self.misses += 1
+        if speculation is not None:
+            self._discard(speculation)
+        return None
+
+    def cancel(self):
+        """Abandons the running speculation, if any, e.g. when the command is not sent to the LLM."""
+        speculation, self.current = self.current, None
+        if speculation is not None:
+            self._discard(speculation)
+
+    def reset(self):
+        self.cancel()
+        self._started_this_utterance = 0
+
+    def _discard(self, speculation):
+        speculation.cancel()
+
+    def _record_waste(self, wasted_ms):
+        """Counts a cancelled request's LLM time, once it has actually stopped."""
+        with self._waste_lock:
+            self.wasted_ms += wasted_ms
+            self._waste.append((time.perf_counter(), wasted_ms))
+
+    @property
+    def hit_rate(self):
+        outcomes = self.hits + self.misses
+        return self.hits / outcomes if outcomes else 0.0
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "mean_saved_ms": self.saved_ms / self.hits if self.hits else None,
+            "wasted_ms": self.wasted_ms,
+            "skipped_for_budget": self.skipped_for_budget,
+        }
@@ -0,0 +1,198 @@
+import heapq
+import itertools
+import threading
+
+from kortex import tracing
+from kortex.tts import split_sentences
+
+PRIORITY_ALARM = 0
+PRIORITY_REPLY = 1
+PRIORITY_REMINDER = 2
+
+
+class SpeechRequest:
+    """One queued announcement. `done` is set once it has been spoken in full or cancelled."""
+
+    def __init__(self, text, priority, voice_id=None, on_start=None, on_done=None, sentences=None):
+        self.text = text
+        self.priority = priority
+        self.voice_id = voice_id
+        self.on_start = on_start
+        self.on_done = on_done
+        self.sentences = sentences
+        self.reminders = [text] if priority == PRIORITY_REMINDER else []
+        # Reminders folded into this announcement; they are done when it is.
+        self.merged = []
+        self.sequence = None
+        self.started = False
+        self.cancelled = False
+        self.interrupted = False
+        self.interaction = tracing.current_interaction()
+        self.done = threading.Event()
+
+
+class SpeechScheduler:
+    """Speaks queued requests on its own thread so the assistant loop never blocks on audio.
+
+    Requests are ordered alarms > replies > reminders. Reminders that are still waiting when
+    their turn comes are merged into a single announcement. A new request with a higher
+    priority than the one being spoken interrupts it; the interrupted request goes back to the
+    front of its priority and resumes from the sentence that was cut off.
+    """
+
+    def __init__(self, tts):
+        self.tts = tts
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._current = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_speaking(self):
+        with self._condition:
+            return self._current is not None or bool(self._queue)
+
+    @property
+    def pending(self):
+        """Requests waiting behind the one being spoken."""
+        with self._condition:
+            return len(self._queue)
+
+    def say(self, text, priority=PRIORITY_REPLY, voice_id=None, on_start=None, on_done=None):
+        return self._submit(SpeechRequest(text, priority, voice_id, on_start, on_done))
+
+    def say_stream(self, sentences, priority=PRIORITY_REPLY, voice_id=None, on_start=None, on_done=None):
+        """Queues an iterable of sentences that may still be being produced."""
+        return self._submit(SpeechRequest(None, priority, voice_id, on_start, on_done, sentences=sentences))
+
+    def remind(self, reminder_text, on_done=None):
+        return self._submit(SpeechRequest(reminder_text, PRIORITY_REMINDER, on_done=on_done))
+
+    def _submit(self, request):
+        with self._condition:
+            request.sequence = next(self._sequence)
+            heapq.heappush(self._queue, (request.priority, request.sequence, request))
+            current = self._current
+            self._condition.notify()
+        if current is not None and request.priority < current.priority:
+            self.interrupt(current)
+        return request
+
+    def cancel(self, request):
+        """Drops a queued request, or stops it if it is being spoken."""
+        with self._condition:
+            request.cancelled = True
+            is_current = request is self._current
+        if is_current:
+            self.tts.cancel()
+
+    def interrupt(self, request=None):
+        """Pauses whatever is being spoken (only if it is still `request`, when given) so the next
+        request goes first; the rest is spoken later."""
+        with self._condition:
+            current = self._current
+            if current is None or (request is not None and current is not request):
+                return
+            current.interrupted = True
+        self.tts.cancel()
+
+    def cancel_all(self):
+        with self._condition:
+            for _, _, request in self._queue:
+                request.cancelled = True
+            current = self._current
+            if current is not None:
+                current.cancelled = True
+        if current is not None:
+            self.tts.cancel()
+
+    def wait_until_idle(self, timeout=None):
+        with self._condition:
+            return self._condition.wait_for(lambda: self._current is None and not self._queue, timeout)
+
+    def _next_request(self):
+        dropped = []
+        with self._condition:
+            self._condition.wait_for(lambda: self._queue or not self._running)
+            if not self._running:
+                return None
+            _, _, request = heapq.heappop(self._queue)
+            if request.priority == PRIORITY_REMINDER and not request.started:
+                pending = [entry for entry in self._queue
+                           if entry[2].priority == PRIORITY_REMINDER and not entry[2].started]
+                for entry in pending:
+                    self._queue.remove(entry)
+                    if entry[2].cancelled:
+                        dropped.append(entry[2])
+                    else:
+                        request.reminders.extend(entry[2].reminders)
+                        request.merged.append(entry[2])
+                heapq.heapify(self._queue)
+            self._current = request
+        for other in dropped:
+            self._finish(other)
+        return request
+
+    @staticmethod
+    def _finish(request):
+        request.done.set()
+        if request.on_done:
+            request.on_done(request)
+
+    def _sentences_for(self, request):
+        if request.sentences is not None:
+            return request.sentences
+        if request.priority == PRIORITY_REMINDER:
+            if len(request.reminders) == 1:
+                return ["Here is your reminder:"] + split_sentences(request.reminders[0])
+            return [f"You have {len(request.reminders)} reminders."] + [
+                sentence for reminder in request.reminders for sentence in split_sentences(reminder)
+            ]
+        return split_sentences(request.text)
+
+    def _run(self):
+        while self._running:
+            request = self._next_request()
+            if request is None:
+                return
+            resume = False
+            try:
+                if not request.cancelled:
+                    if request.on_start and not request.started:
+                        request.on_start(request)
+                    request.started = True
+                    sentences = self._sentences_for(request)
+                    if isinstance(sentences, list):
+                        print(f"Kortex: {' '.join(sentences)}")
+                    with tracing.in_interaction(request.interaction):
+                        stream = self.tts.speak_stream(sentences, request.voice_id)
+                    if request.cancelled or request.interrupted:
+                        stream.cancel()
+                    stream.play()
+                    if request.interrupted and not request.cancelled:
+                        request.interrupted = False
+                        request.sentences = stream.remaining()
+                        resume = True
+            except Exception as e:
+                print(f"Error while speaking: {e}")
+            finally:
+                with self._condition:
+                    self._current = None
+                    if resume:
+                        # Its original sequence number puts it ahead of later requests of its priority.
+                        heapq.heappush(self._queue, (request.priority, request.sequence, request))
+                    self._condition.notify_all()
+                if not resume:
+                    for merged in request.merged:
+                        self._finish(merged)
+                    self._finish(request)
+
+    def close(self):
+        self.cancel_all()
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=2)
@@ -0,0 +1,149 @@
+"""Startup profiling: per-module import time and time to "Kortex is now running."
+
+Start Kortex with `python -m kortex.main --profile-startup` (or KORTEX_PROFILE_STARTUP=1) to get
+a report once the startup announcement begins playing. To profile just the imports and tool
+schemas, without a microphone or GUI, run `python -m kortex.startup_profile`.
+
+Each report is saved to cache/startup_profile.json and compared with the previous one. Phases
+and imports that got noticeably slower are flagged, so that startup regressions show up.
+"""
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+
+REPORT_PATH = "cache/startup_profile.json"
+
+_original_import = builtins.__import__
+_started_at = None
+_phases = []
+_imports = {}
+_local = threading.local()
+
+
+def requested():
+    return "--profile-startup" in sys.argv or os.environ.get("KORTEX_PROFILE_STARTUP") == "1"
+
+
+def active():
+    return _started_at is not None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in sys.modules and not fromlist:
+        return _original_import(name, globals, locals, fromlist, level)
+    try:
+        resolved = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__")) if level else name
+    except (ImportError, ValueError):
+        resolved = name
+    candidates = [resolved] + [f"{resolved}.{item}" for item in fromlist or () if item != "*"]
+    new = [module for module in candidates if module not in sys.modules]
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        loaded = [module for module in new if module in sys.modules]
+        if loaded:
+            _imports[loaded[-1]] = (1000.0 * elapsed, 1000.0 * (elapsed - children))
+
+
+def install():
+    """Starts the clock and times every import from here on. Call it before the heavy imports."""
+    global _started_at
+    if _started_at is None:
+        _started_at = time.perf_counter()
+        builtins.__import__ = _timed_import
+
+
+def mark(phase):
+    """Records that a startup phase has finished."""
+    if _started_at is not None:
+        _phases.append((phase, 1000.0 * (time.perf_counter() - _started_at)))
+
+
+def _load_previous(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _slower(current, previous, min_ms=50.0, ratio=1.2):
+    return current - previous >= min_ms and current >= previous * ratio
+
+
+def report(final_phase="Kortex is now running.", top=15, path=REPORT_PATH):
+    """Prints the startup profile, saves it and flags regressions against the previous run."""
+    global _started_at
+    if _started_at is None:
+        return None
+    mark(final_phase)
+    builtins.__import__ = _original_import
+    total_ms = _phases[-1][1]
+    _started_at = None
+
+    print(f"\nStartup profile: {total_ms:.0f} ms to '{final_phase}'")
+    previous_end = 0.0
+    for phase, at_ms in _phases:
+        print(f"  {at_ms:8.0f} ms  (+{at_ms - previous_end:6.0f} ms)  {phase}")
+        previous_end = at_ms
+    imports_ms = sum(self_ms for _, self_ms in _imports.values())
+    print(f"Imports: {len(_imports)} modules, {imports_ms:.0f} ms in total. Slowest (cumulative / self):")
+    for module, (cumulative_ms, self_ms) in sorted(_imports.items(), key=lambda item: -item[1][0])[:top]:
+        print(f"  {cumulative_ms:8.1f} ms  {self_ms:8.1f} ms  {module}")
+
+    profile = {
+        "total_ms": total_ms,
+        "phases": {phase: at_ms for phase, at_ms in _phases},
+        "imports": {module: round(cumulative_ms, 2) for module, (cumulative_ms, _) in _imports.items()},
+    }
+    previous = _load_previous(path)
+    if previous:
+        regressions = []
+        for kind in ("phases", "imports"):
+            for name, now in profile[kind].items():
+                before = previous.get(kind, {}).get(name)
+                if before is not None and _slower(now, before):
+                    regressions.append(f"{name} {before:.0f} -> {now:.0f} ms")
+        change = total_ms - previous.get("total_ms", total_ms)
+        print(f"Compared with the previous run: {change:+.0f} ms to '{final_phase}'.")
+        for regression in regressions:
+            print(f"  Slower: {regression}")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def main():
+    """Profiles importing the assistant and compiling the tool schemas, without starting it."""
+    install()
+    import kortex.main  # noqa: F401
+    mark("import kortex.main")
+    from kortex.tools import build_tool_registry
+    from kortex.tools.schema import ToolSchemas
+    ToolSchemas(build_tool_registry())
+    mark("tool registry and schemas")
+    heavy = [module for module in ("pyautogui", "pint", "asteval", "dateutil", "pycaw", "comtypes",
+                                   "screen_brightness_control", "smtplib") if module in sys.modules]
+    report("ready to start", path="cache/startup_profile_imports.json")
+    if heavy:
+        print(f"Loaded at startup although only tools use them: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import math
+
+
+def percentile(values, fraction):
+    """The nearest-rank percentile of values (fraction between 0 and 1), or None if there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * fraction) - 1)]
@@ -1,56 +1,542 @@
-import pyaudio
 import json
+import threading
+import time
+import wave
+from collections import deque
 import yaml
 import numpy as np
 from vosk import Model, KaldiRecognizer
+from vosk.vosk_cffi import ffi as vosk_ffi
+
+SAMPLE_RATE = 16000
+
+
+def frame_rms(samples, frame_size):
+    """Returns the RMS level of each full frame_size frame in an int16 buffer."""
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        frames = samples.reshape(1, -1)
+    else:
+        frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+    return np.sqrt(np.mean(frames.astype(np.float32)**2, axis=1))
+
+
+class AudioRingBuffer:
+    """Preallocated single-producer/single-consumer ring of int16 samples.
+
+    The capture callback only ever advances the write index and the recognizer only ever
+    advances the read index, so neither side needs a lock. When the ring is full, incoming
+    samples are dropped and counted instead of overwriting audio the reader has not seen yet.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._write_index = 0
+        self._read_index = 0
+        self._data_ready = threading.Event()
+        self.overflow_count = 0
+        self.dropped_frames = 0
+
+    @property
+    def backlog(self):
+        return self._write_index - self._read_index
+
+    def write(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        free = self.capacity - self.backlog
+        if len(samples) > free:
+            self.overflow_count += 1
+            self.dropped_frames += len(samples) - free
+            samples = samples[:free]
+        if len(samples) == 0:
+            return
+
+        start = self._write_index % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        self._buffer[:len(samples) - first] = samples[first:]
+        self._write_index += len(samples)
+        self._data_ready.set()
+
+    def peek(self, max_frames, timeout=None):
+        """Returns a zero-copy view of up to max_frames unread samples, or None on timeout.
+
+        The view stays valid until it is handed back through consume().
+        """
+        if self.backlog == 0:
+            self._data_ready.clear()
+            if self.backlog == 0 and not self._data_ready.wait(timeout):
+                return None
+        start = self._read_index % self.capacity
+        count = min(max_frames, self.backlog, self.capacity - start)
+        return self._buffer[start:start + count]
+
+    def consume(self, frames):
+        self._read_index += frames
+
+    def clear(self):
+        self._read_index = self._write_index
+
+
+class VoiceActivityDetector:
+    """Energy-based speech gate with an adaptive noise floor, hangover and pre-roll.
+
+    Frames are voiced when their RMS exceeds max(min_threshold, noise_floor * threshold_ratio);
+    the noise floor tracks unvoiced frames so the gate follows the room. It also rises slowly
+    towards the quietest frame of the last noise_window_ms, voiced or not, so that a room that
+    gets louder (a fan, traffic) cannot hold the gate open for good. Skipped audio is kept in a
+    short pre-roll so the recognizer still hears word onsets when speech starts.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=20, min_threshold=250.0, threshold_ratio=3.0,
+                 noise_adaptation=0.05, hangover_ms=800, pre_roll_ms=300, noise_window_ms=2000):
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.min_threshold = float(min_threshold)
+        self.threshold_ratio = float(threshold_ratio)
+        self.noise_adaptation = float(noise_adaptation)
+        self.noise_floor = self.min_threshold / self.threshold_ratio
+        # Pauses between words are quiet, so the minimum over a couple of seconds stays near the
+        # room's level even while someone is talking.
+        self._recent_rms = deque(maxlen=max(1, noise_window_ms // frame_ms))
+        self.hangover_frames = sample_rate * hangover_ms // 1000
+        self._hangover_left = 0
+
+        self._pre_roll = np.zeros(sample_rate * pre_roll_ms // 1000, dtype=np.int16)
+        self._pre_roll_fill = 0
+
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.noise_floor * self.threshold_ratio)
+
+    def is_speech(self, samples):
+        rms = frame_rms(samples, self.frame_size)
+        voiced = rms > self.threshold
+
+        quiet = rms[~voiced]
+        if len(quiet):
+            self.noise_floor += self.noise_adaptation * (float(quiet.mean()) - self.noise_floor)
+        self._recent_rms.extend(rms.tolist())
+        recent_min = min(self._recent_rms)
+        if len(self._recent_rms) == self._recent_rms.maxlen and recent_min > self.noise_floor:
+            self.noise_floor += self.noise_adaptation * (recent_min - self.noise_floor)
+
+        if voiced.any():
+            self._hangover_left = self.hangover_frames
+            return True
+        if self._hangover_left > 0:
+            self._hangover_left -= len(samples)
+            return True
+        return False
+
+    def remember(self, samples):
+        """Keeps the tail of a skipped chunk as pre-roll for the next speech onset."""
+        size = len(self._pre_roll)
+        if size == 0:
+            return
+        n = min(len(samples), size)
+        self._pre_roll[:size - n] = self._pre_roll[n:]
+        self._pre_roll[size - n:] = samples[len(samples) - n:]
+        self._pre_roll_fill = min(size, self._pre_roll_fill + n)
+
+    def take_pre_roll(self):
+        pre_roll = self._pre_roll[len(self._pre_roll) - self._pre_roll_fill:]
+        self._pre_roll_fill = 0
+        return pre_roll
+
+    def reset(self):
+        self._hangover_left = 0
+        self._pre_roll_fill = 0
+
+    def stats(self):
+        total = self.frames_decoded + self.frames_skipped
+        return {
+            "vad_frames_decoded": self.frames_decoded,
+            "vad_frames_skipped": self.frames_skipped,
+            "vad_skip_ratio": self.frames_skipped / total if total else 0.0,
+            "vad_noise_floor": self.noise_floor,
+            "vad_threshold": self.threshold,
+        }
+
+
+class UtteranceEndpointer:
+    """Ends command utterances early and measures end-of-speech-to-text latency.
+
+    An utterance is finalized once the recognizer's partial hypothesis has stayed the same for
+    stable_chunks chunks and at least silence_ms of trailing audio has been below the speech
+    threshold, instead of waiting for Vosk's own, more conservative endpoint rules.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=20, silence_ms=400, stable_chunks=2, early=True):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.silence_frames = sample_rate * silence_ms // 1000
+        self.stable_chunks = stable_chunks
+        self.early = early
+        self.latencies = deque(maxlen=100)
+        self.last_utterance = None
+        self.reset()
+
+    def reset(self):
+        self._partial = ""
+        self._stable_count = 0
+        self._speech_seen = False
+        self._trailing_silence = 0
+        self._speech_end_time = None
+
+    def observe_audio(self, samples, chunk_end_time, threshold):
+        voiced = np.flatnonzero(frame_rms(samples, self.frame_size) > threshold)
+        if len(voiced):
+            self._speech_seen = True
+            last_voiced_end = min(int(voiced[-1] + 1) * self.frame_size, len(samples))
+            self._trailing_silence = len(samples) - last_voiced_end
+            self._speech_end_time = chunk_end_time - self._trailing_silence / self.sample_rate
+        elif self._speech_seen:
+            self._trailing_silence += len(samples)
+
+    @property
+    def partial(self):
+        return self._partial
+
+    @property
+    def stable_count(self):
+        """How many consecutive chunks the current partial hypothesis has stayed the same."""
+        return self._stable_count
+
+    def observe_partial(self, partial):
+        if partial and partial == self._partial:
+            self._stable_count += 1
+        else:
+            self._partial = partial
+            self._stable_count = 0
+
+    def should_finalize(self):
+        return (self.early and self._speech_seen and bool(self._partial)
+                and self._stable_count >= self.stable_chunks
+                and self._trailing_silence >= self.silence_frames)
+
+    def finish(self, text, endpoint, now):
+        latency_ms = None
+        if self._speech_end_time is not None:
+            latency_ms = 1000.0 * (now - self._speech_end_time)
+            self.latencies.append(latency_ms)
+        self.last_utterance = {
+            "text": text,
+            "endpoint": endpoint,
+            "end_of_speech_to_text_ms": latency_ms,
+            "trailing_silence_ms": 1000.0 * self._trailing_silence / self.sample_rate,
+        }
+        if latency_ms is not None:
+            print(f"STT utterance finalized ({endpoint}) {latency_ms:.0f} ms after end of speech.")
+        self.reset()
+        return self.last_utterance
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "endpoint_mode": "early" if self.early else "vosk",
+            "utterances": len(latencies),
+            "end_of_speech_to_text_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        }
+
+
+class MicrophoneSource:
+    """Captures microphone audio on PortAudio's callback thread into an AudioRingBuffer."""
+
+    exhausted = False
+
+    def __init__(self, sample_rate=SAMPLE_RATE, capture_frames=1024, buffer_seconds=30):
+        import pyaudio
+        self._pyaudio = pyaudio
+        self.sample_rate = sample_rate
+        self.ring = AudioRingBuffer(sample_rate * buffer_seconds)
+        self.input_overflows = 0
+
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=sample_rate,
+            input=True,
+            frames_per_buffer=capture_frames,
+            stream_callback=self._on_audio
+        )
+
+    def _on_audio(self, in_data, frame_count, time_info, status_flags):
+        if status_flags & self._pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        self.ring.write(in_data)
+        return (None, self._pyaudio.paContinue)
+
+    def start(self):
+        self.stream.start_stream()
+
+    @property
+    def backlog(self):
+        return self.ring.backlog
+
+    def clock(self):
+        """Wall-clock time of the most recently captured sample."""
+        return time.monotonic()
+
+    def peek(self, max_frames, timeout=None):
+        return self.ring.peek(max_frames, timeout)
+
+    def consume(self, frames):
+        self.ring.consume(frames)
+
+    def discard_pending(self):
+        self.ring.clear()
+
+    def stats(self):
+        return {
+            "backlog_frames": self.ring.backlog,
+            "backlog_ms": 1000.0 * self.ring.backlog / self.sample_rate,
+            "ring_overflows": self.ring.overflow_count,
+            "dropped_frames": self.ring.dropped_frames,
+            "input_overflows": self.input_overflows,
+        }
+
+    def close(self):
+        if self.stream.is_active():
+            self.stream.stop_stream()
+        self.stream.close()
+        self.p.terminate()
+
+
+class PCMSource:
+    """Offline audio source that serves 16 kHz mono int16 samples as fast as they are consumed.
+
+    Its clock runs on audio time (the position of the next unread sample), so latencies
+    measured against it are in seconds of audio rather than wall time.
+    """
+
+    backlog = 0
+
+    def __init__(self, samples, sample_rate=SAMPLE_RATE, name="pcm"):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.name = name
+        self.position = 0
+
+    @classmethod
+    def from_wav(cls, path):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported.")
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        if rate != SAMPLE_RATE:
+            duration = len(samples) / rate
+            target = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+            samples = np.interp(target, np.arange(len(samples)) / rate, samples).astype(np.int16)
+        return cls(samples, name=path)
+
+    @classmethod
+    def from_raw(cls, stream, name="raw"):
+        """Reads headerless 16 kHz mono int16 PCM from a binary file object, e.g. sys.stdin.buffer."""
+        return cls(np.frombuffer(stream.read(), dtype=np.int16), name=name)
+
+    @property
+    def exhausted(self):
+        return self.position >= len(self.samples)
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def start(self):
+        pass
+
+    def clock(self):
+        return self.position / self.sample_rate
+
+    def peek(self, max_frames, timeout=None):
+        if self.exhausted:
+            return None
+        return self.samples[self.position:self.position + max_frames]
+
+    def consume(self, frames):
+        self.position += frames
+
+    def discard_pending(self):
+        pass
+
+    def stats(self):
+        return {"frames_read": self.position, "frames_total": len(self.samples)}
+
+    def close(self):
+        pass
 
 
 class SpeechToText:
-    def __init__(self, config_path="kortex/config.yaml"):
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+    def __init__(self, config_path="kortex/config.yaml", audio_source=None, config=None):
+        if config is None:
+            with open(config_path, 'r') as f:
+                config = yaml.safe_load(f)
         model_path = config['stt_model_path']
         self.wake_words = config.get('wake_words', ["cortex"])
-        
+        stt_config = config.get('stt', {})
+
         try:
             self.model = Model(model_path)
         except Exception as e:
             raise e
-            
-        self.wake_word_recognizer = KaldiRecognizer(self.model, 16000, json.dumps(self.wake_words))
-        self.command_recognizer = KaldiRecognizer(self.model, 16000)
-        
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=16000,
-            input=True,
-            frames_per_buffer=4096
+
+        self.wake_word_recognizer = KaldiRecognizer(self.model, SAMPLE_RATE, json.dumps(self.wake_words))
+        self.command_recognizer = KaldiRecognizer(self.model, SAMPLE_RATE)
+
+        # Recognition consumes whatever has been captured, up to this many frames per call,
+        # so latency is bounded by the capture callback size rather than a fixed 4096-frame read.
+        self.chunk_frames = stt_config.get('chunk_frames', 4096)
+        self.read_timeout = stt_config.get('read_timeout_ms', 100) / 1000.0
+
+        vad_config = stt_config.get('vad', {})
+        self.vad = None
+        if vad_config.get('enabled', True):
+            self.vad = VoiceActivityDetector(
+                sample_rate=SAMPLE_RATE,
+                frame_ms=vad_config.get('frame_ms', 20),
+                min_threshold=vad_config.get('min_threshold', 250.0),
+                threshold_ratio=vad_config.get('threshold_ratio', 3.0),
+                noise_adaptation=vad_config.get('noise_adaptation', 0.05),
+                hangover_ms=vad_config.get('hangover_ms', 800),
+                pre_roll_ms=vad_config.get('pre_roll_ms', 300),
+                noise_window_ms=vad_config.get('noise_window_ms', 2000)
+            )
+
+        endpoint_config = stt_config.get('endpointing', {})
+        self.silence_threshold = endpoint_config.get('silence_threshold', 250.0)
+        self.endpointer = UtteranceEndpointer(
+            sample_rate=SAMPLE_RATE,
+            silence_ms=endpoint_config.get('silence_ms', 400),
+            stable_chunks=endpoint_config.get('stable_chunks', 2),
+            early=endpoint_config.get('mode', 'early') == 'early'
+        )
+
+        self.source = audio_source or MicrophoneSource(
+            sample_rate=SAMPLE_RATE,
+            capture_frames=stt_config.get('capture_frames', 1024),
+            buffer_seconds=stt_config.get('ring_buffer_seconds', 30)
         )
         print("STT Engine Initialized.")
-        self.stream.start_stream()
+        self.source.start()
+
+    def set_source(self, audio_source):
+        """Switches to another audio source and starts recognition from a clean state."""
+        self.source.close()
+        self.source = audio_source
+        self.reset()
+        self.source.start()
 
     def process_chunk(self, is_wake_word_detection=False, volume_callback=None):
         recognizer = self.wake_word_recognizer if is_wake_word_detection else self.command_recognizer
-        data = self.stream.read(4096, exception_on_overflow=False)
+        audio_data = self.source.peek(self.chunk_frames, timeout=self.read_timeout)
+        if audio_data is None:
+            return None
+        chunk_end_time = self.source.clock() - (self.source.backlog - len(audio_data)) / SAMPLE_RATE
 
-        if volume_callback:
-            audio_data = np.frombuffer(data, dtype=np.int16)
-            rms = np.sqrt(np.mean(audio_data.astype(np.float32)**2))
-            volume_callback(rms)
+        try:
+            if volume_callback:
+                rms = frame_rms(audio_data, len(audio_data))[0]
+                volume_callback(rms)
+
+            if is_wake_word_detection and self.vad:
+                accepted = self._accept_gated(recognizer, audio_data)
+            else:
+                if not is_wake_word_detection:
+                    threshold = self.vad.threshold if self.vad else self.silence_threshold
+                    self.endpointer.observe_audio(audio_data, chunk_end_time, threshold)
+                accepted = recognizer.AcceptWaveform(vosk_ffi.from_buffer(audio_data))
+        finally:
+            self.source.consume(len(audio_data))
 
-        if recognizer.AcceptWaveform(data):
+        endpoint = "vosk"
+        if accepted:
             result = json.loads(recognizer.Result())
-            if result['text']:
-                if volume_callback:
-                    volume_callback(0)
-                return result['text']
+        elif is_wake_word_detection:
+            return None
+        else:
+            self.endpointer.observe_partial(json.loads(recognizer.PartialResult())['partial'])
+            if not self.endpointer.should_finalize():
+                return None
+            result = json.loads(recognizer.FinalResult())
+            endpoint = "early"
+
+        if result['text']:
+            if not is_wake_word_detection:
+                self.endpointer.finish(result['text'], endpoint, self.source.clock())
+            if volume_callback:
+                volume_callback(0)
+            return result['text']
+        if not is_wake_word_detection:
+            self.endpointer.reset()
         return None
 
+    def _accept_gated(self, recognizer, audio_data):
+        """Feeds the wake-word recognizer only while the VAD reports speech."""
+        if not self.vad.is_speech(audio_data):
+            self.vad.frames_skipped += len(audio_data)
+            self.vad.remember(audio_data)
+            return False
+
+        pre_roll = self.vad.take_pre_roll()
+        if len(pre_roll):
+            # One call for both: a result finalized by the pre-roll alone would be replaced by
+            # the chunk's before the caller reads it.
+            audio_data = np.concatenate((pre_roll, audio_data))
+        self.vad.frames_decoded += len(audio_data)
+        return recognizer.AcceptWaveform(vosk_ffi.from_buffer(audio_data))
+
+    def flush(self):
+        """Finalizes whatever the command recognizer has heard, e.g. at the end of a file."""
+        result = json.loads(self.command_recognizer.FinalResult())
+        if result['text']:
+            self.endpointer.finish(result['text'], "flush", self.source.clock())
+            return result['text']
+        self.endpointer.reset()
+        return None
+
+    def reset(self):
+        self.wake_word_recognizer.Reset()
+        self.command_recognizer.Reset()
+        self.endpointer.reset()
+        if self.vad:
+            self.vad.reset()
+
+    def discard_pending(self):
+        """Drops audio captured so far, e.g. the assistant's own voice while it was speaking."""
+        self.source.discard_pending()
+        self.endpointer.reset()
+        if self.vad:
+            self.vad.reset()
+
+    def stable_partial(self, min_chunks):
+        """The command partial hypothesis if it has not changed for min_chunks chunks, else None."""
+        if self.endpointer.partial and self.endpointer.stable_count >= min_chunks:
+            return self.endpointer.partial
+        return None
+
+    @property
+    def last_utterance(self):
+        """Transcript, endpoint type and end-of-speech-to-text latency of the last command."""
+        return self.endpointer.last_utterance
+
+    def stats(self):
+        stats = self.source.stats()
+        stats.update(self.endpointer.stats())
+        if self.vad:
+            stats.update(self.vad.stats())
+        return stats
+
     def close(self):
-        if self.stream.is_active():
-            self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
-        print("STT stream closed.")
\ No newline at end of file
+        print(f"STT capture stats: {self.stats()}")
+        self.source.close()
+        print("STT stream closed.")
@@ -0,0 +1,182 @@
+"""Offline STT benchmark: replays a directory of WAV files through SpeechToText.
+
+Corpus layout (all sidecar files are optional):
+
+    corpus/
+        wake_01.wav      "hey cortex, what time is it"
+        wake_01.json     {"wake_word_end": 0.92}
+        wake_01.txt      what time is it
+        noise_01.wav     background audio with no wake word, used for false accepts
+
+A file with "wake_word_end" (seconds) in its .json sidecar contains a wake word; every other
+file without a transcript is negative audio, decoded in wake-word mode to count false accepts.
+If a .txt reference transcript exists, the audio after the wake word (or the whole file, for
+files without one) goes through the command recognizer and is scored for WER. False accepts
+per hour only count the seconds of negative audio that actually went through wake-word mode.
+
+    python -m kortex.stt_benchmark corpus/ --model models/vosk-model-small-en-us-0.15
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import yaml
+
+from kortex.stt import SpeechToText, PCMSource
+
+
+def word_errors(reference, hypothesis):
+    """Returns the word-level Levenshtein distance between two transcripts."""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def load_corpus(corpus_dir):
+    items = []
+    for wav_path in sorted(glob.glob(os.path.join(corpus_dir, "*.wav"))):
+        base = os.path.splitext(wav_path)[0]
+        meta = {}
+        if os.path.exists(base + ".json"):
+            with open(base + ".json", 'r') as f:
+                meta = json.load(f)
+        if os.path.exists(base + ".txt"):
+            with open(base + ".txt", 'r', encoding='utf-8') as f:
+                meta['transcript'] = f.read().strip()
+        items.append((wav_path, meta))
+    return items
+
+
+def run_file(stt, source, meta):
+    """Pushes one file through wake-word and command recognition as fast as possible."""
+    stt.set_source(source)
+    has_wake_word = 'wake_word_end' in meta
+    mode = "wake_word" if has_wake_word or 'transcript' not in meta else "command"
+    wake_mode_s = 0.0
+    wake_detected_at = None
+    false_accepts = 0
+    transcripts = []
+
+    while not source.exhausted:
+        text = stt.process_chunk(is_wake_word_detection=(mode == "wake_word"))
+        if not text:
+            continue
+        if mode == "wake_word" and text in stt.wake_words:
+            if not has_wake_word:
+                false_accepts += 1
+                continue
+            wake_detected_at = source.clock()
+            if 'transcript' not in meta:
+                break
+            wake_mode_s = wake_detected_at
+            mode = "command"
+        elif mode == "command":
+            transcripts.append(text)
+
+    if mode == "command":
+        tail = stt.flush()
+        if tail:
+            transcripts.append(tail)
+    else:
+        wake_mode_s = source.clock()
+
+    return {
+        "file": source.name,
+        "duration_s": source.duration,
+        "wake_mode_s": wake_mode_s,
+        "has_wake_word": has_wake_word,
+        "wake_detected": wake_detected_at is not None,
+        "wake_latency_ms": 1000.0 * (wake_detected_at - meta['wake_word_end']) if wake_detected_at is not None and has_wake_word else None,
+        "false_accepts": false_accepts,
+        "hypothesis": " ".join(transcripts) if 'transcript' in meta else None,
+        "reference": meta.get('transcript'),
+    }
+
+
+def summarize(results, processing_s):
+    audio_s = sum(r['duration_s'] for r in results)
+    wake_files = [r for r in results if r['has_wake_word']]
+    # Only audio decoded in wake-word mode could have produced a false accept.
+    negative_s = sum(r['wake_mode_s'] for r in results if not r['has_wake_word'])
+    latencies = sorted(r['wake_latency_ms'] for r in wake_files if r['wake_latency_ms'] is not None)
+    scored = [r for r in results if r['reference'] is not None]
+    ref_words = sum(len(r['reference'].split()) for r in scored)
+    errors = sum(word_errors(r['reference'], r['hypothesis'] or "") for r in scored)
+
+    return {
+        "files": len(results),
+        "audio_s": audio_s,
+        "processing_s": processing_s,
+        "real_time_factor": processing_s / audio_s if audio_s else None,
+        "wake_recall": sum(r['wake_detected'] for r in wake_files) / len(wake_files) if wake_files else None,
+        "wake_latency_p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        "wake_latency_max_ms": latencies[-1] if latencies else None,
+        "false_accepts": sum(r['false_accepts'] for r in results),
+        "false_accepts_per_hour": sum(r['false_accepts'] for r in results) / (negative_s / 3600.0) if negative_s else None,
+        "wer": errors / ref_words if ref_words else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a WAV corpus through Kortex speech recognition.")
+    parser.add_argument("corpus", help="Directory of .wav files with optional .txt/.json sidecars.")
+    parser.add_argument("--config", default="kortex/config.yaml", help="Config file to read STT settings from.")
+    parser.add_argument("--model", help="Vosk model directory; overrides stt_model_path from the config.")
+    parser.add_argument("--output", help="Write per-file results and the summary to this JSON file.")
+    parser.add_argument("--max-rtf", type=float, help="Fail if the real-time factor exceeds this value.")
+    parser.add_argument("--max-wer", type=float, help="Fail if the word error rate exceeds this value.")
+    parser.add_argument("--max-fa-per-hour", type=float, help="Fail if false accepts per hour exceed this value.")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r') as f:
+            config = yaml.safe_load(f)
+    if args.model:
+        config['stt_model_path'] = args.model
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"No .wav files found in {args.corpus}.")
+        return 1
+
+    stt = SpeechToText(audio_source=PCMSource.from_wav(corpus[0][0]), config=config)
+    results = []
+    processing_s = 0.0
+    for wav_path, meta in corpus:
+        source = PCMSource.from_wav(wav_path)
+        start = time.perf_counter()
+        results.append(run_file(stt, source, meta))
+        processing_s += time.perf_counter() - start
+    stt.close()
+
+    summary = summarize(results, processing_s)
+    for key, value in summary.items():
+        print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"summary": summary, "files": results}, f, indent=2)
+
+    failures = []
+    if args.max_rtf is not None and summary['real_time_factor'] > args.max_rtf:
+        failures.append(f"real-time factor {summary['real_time_factor']:.3f} > {args.max_rtf}")
+    if args.max_wer is not None and summary['wer'] is not None and summary['wer'] > args.max_wer:
+        failures.append(f"WER {summary['wer']:.3f} > {args.max_wer}")
+    if args.max_fa_per_hour is not None and (summary['false_accepts_per_hour'] or 0) > args.max_fa_per_hour:
+        failures.append(f"false accepts/hour {summary['false_accepts_per_hour']:.2f} > {args.max_fa_per_hour}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import importlib
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from kortex import tracing
+from kortex.tools import TOOLS, load_tool
+
+_job = None
+
+
+def _limit_resources(memory_limit_mb):
+    """Process pool initializer: caps the worker's memory so a runaway expression fails instead of swapping."""
+    global _job
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        return
+    except (ImportError, ValueError, OSError):
+        pass
+    try:
+        import win32api
+        import win32job
+        _job = win32job.CreateJobObject(None, "")
+        info = win32job.QueryInformationJobObject(_job, win32job.JobObjectExtendedLimitInformation)
+        info['ProcessMemoryLimit'] = limit
+        info['BasicLimitInformation']['LimitFlags'] |= win32job.JOB_OBJECT_LIMIT_PROCESS_MEMORY
+        win32job.SetInformationJobObject(_job, win32job.JobObjectExtendedLimitInformation, info)
+        win32job.AssignProcessToJobObject(_job, win32api.GetCurrentProcess())
+    except Exception as e:
+        print(f"Tool sandbox runs without a memory limit: {e}")
+
+
+def _init_worker(memory_limit_mb, tools):
+    """Process pool initializer: loads the sandboxed tools, then caps the worker's memory.
+
+    Loading here keeps module imports and warm_up() (e.g. pint's unit registry) out of the first
+    call's deadline.
+    """
+    try:
+        for module, name in tools:
+            load_tool(module, name)
+        for module in sorted({module for module, _ in tools}):
+            warm_up = getattr(importlib.import_module(f"kortex.tools.{module}"), "warm_up", None)
+            if warm_up:
+                warm_up()
+    except Exception as e:
+        print(f"Could not preload the sandboxed tools: {e}")
+    _limit_resources(memory_limit_mb)
+
+
+def _timed_call(func, parameters):
+    """Runs a tool in a worker process and reports how long it took there."""
+    start = time.perf_counter()
+    result = func(**parameters)
+    return result, 1000.0 * (time.perf_counter() - start)
+
+
+class ToolRun:
+    """The outcome of one tool call: its result (or failure message) and how long it took."""
+
+    def __init__(self, tool_name, parameters):
+        self.tool_name = tool_name
+        self.parameters = parameters
+        self.result = None
+        self.error = None
+        self.timed_out = False
+        self.sandbox = "thread"
+        self.deadline = None
+        self.started_at = None
+        self.elapsed_ms = None
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+    def timing(self):
+        return {"tool_name": self.tool_name, "elapsed_ms": self.elapsed_ms, "ok": self.ok,
+                "timed_out": self.timed_out, "sandbox": self.sandbox}
+
+
+class ToolExecutor:
+    """Runs tool calls off the assistant's threads, each against its own deadline.
+
+    A tool's deadline and sandbox come from the "Timeout:" and "Sandbox:" lines of its docstring
+    (see ToolSchemas); tools without them get the default timeout and run on the thread pool.
+    CPU-bound tools ("Sandbox: process") run in a small pool of memory-capped worker processes,
+    so they can be stopped.
+
+    Deadlines are counted from when the batch was submitted. A call that misses its deadline is
+    reported as timed out and its result discarded. A thread cannot be stopped, so it is left to
+    finish in the background; a worker process is killed and the process pool started afresh.
+    """
+
+    def __init__(self, max_workers=4, timeout=10.0, thread_init=None, tool_schemas=None,
+                 process_workers=1, memory_limit_mb=512):
+        self.timeout = timeout
+        self.tool_schemas = tool_schemas
+        self.process_workers = process_workers
+        self.memory_limit_mb = memory_limit_mb
+        self.timeouts = 0
+        self.process_restarts = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kortex-tool", initializer=thread_init)
+        self._process_pool = None
+        self._process_tools = [TOOLS[name] for name, schema in self._schemas().items()
+                               if schema.sandbox == "process" and name in TOOLS]
+        self._warm_process_pool()
+
+    def _schemas(self):
+        return self.tool_schemas.schemas if self.tool_schemas is not None else {}
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers, initializer=_init_worker,
+                initargs=(self.memory_limit_mb, self._process_tools)
+            )
+        return self._process_pool
+
+    def _warm_process_pool(self):
+        # Spawn the workers now; spawning them on the first call would eat into its deadline.
+        if self._process_tools:
+            for _ in range(self.process_workers):
+                self._get_process_pool().submit(int)
+
+    def _restart_process_pool(self, warm=True):
+        pool, self._process_pool = self._process_pool, None
+        if pool is None:
+            return
+        self.process_restarts += 1
+        kill_workers = getattr(pool, 'kill_workers', None)
+        if kill_workers:
+            kill_workers()
+        else:
+            for process in list((pool._processes or {}).values()):
+                process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+        if warm:
+            self._warm_process_pool()
+
+    def _run(self, func, parameters):
+        # Returns the outcome instead of writing it to the run: a thread that missed its deadline
+        # keeps going, and must not overwrite the run after it has been reported as timed out.
+        started_at = time.perf_counter()
+        result, error = None, None
+        try:
+            result = func(**parameters)
+        except Exception as e:
+            error = str(e)
+        return result, error, started_at, 1000.0 * (time.perf_counter() - started_at)
+
+    def _submit(self, run, func):
+        if run.sandbox == "process":
+            run.started_at = time.perf_counter()
+            return self._get_process_pool().submit(_timed_call, func, run.parameters)
+        return self._pool.submit(self._run, func, run.parameters)
+
+    def run_all(self, calls, resolve):
+        """Runs every {"tool_name", "parameters"} call; resolve(tool_name) returns the function to call."""
+        submitted_at = time.perf_counter()
+        runs, futures = [], []
+        for call in calls:
+            run = ToolRun(call['tool_name'], call.get('parameters') or {})
+            schema = self._schemas().get(run.tool_name)
+            run.deadline = submitted_at + ((schema and schema.timeout) or self.timeout)
+            run.sandbox = schema.sandbox if schema else "thread"
+            runs.append(run)
+            futures.append(self._submit(run, resolve(run.tool_name)))
+
+        restart = False
+        for run, future in sorted(zip(runs, futures), key=lambda pair: pair[0].deadline):
+            try:
+                outcome = future.result(timeout=max(0.0, run.deadline - time.perf_counter()))
+            except FutureTimeout:
+                run.timed_out = True
+                run.elapsed_ms = 1000.0 * (time.perf_counter() - submitted_at)
+                self.timeouts += 1
+                restart = restart or run.sandbox == "process"
+            except Exception as e:
+                # Only process runs get here; _run catches a thread run's exception.
+                run.error = str(e) or type(e).__name__
+                run.elapsed_ms = 1000.0 * (time.perf_counter() - run.started_at)
+                restart = restart or isinstance(e, BrokenProcessPool)
+            else:
+                if run.sandbox == "process":
+                    run.result, run.elapsed_ms = outcome
+                else:
+                    run.result, run.error, run.started_at, run.elapsed_ms = outcome
+        if restart:
+            self._restart_process_pool()
+        for run in runs:
+            started_at = run.started_at or submitted_at
+            tracing.record(f"tool.{run.tool_name}", started_at, started_at + run.elapsed_ms / 1000.0,
+                           sandbox=run.sandbox, ok=run.ok, timed_out=run.timed_out)
+
+        wall_ms = 1000.0 * (time.perf_counter() - submitted_at)
+        timings = ", ".join(
+            f"{run.tool_name} {run.elapsed_ms:.0f} ms{'' if run.ok else ' (timed out)' if run.timed_out else ' (failed)'}"
+            for run in runs
+        )
+        print(f"Ran {len(runs)} tools in {wall_ms:.0f} ms: {timings}")
+        return runs
+
+    def run(self, tool_name, parameters, resolve):
+        """Runs a single call; see run_all()."""
+        return self.run_all([{'tool_name': tool_name, 'parameters': parameters}], resolve)[0]
+
+    def stats(self):
+        return {"timeouts": self.timeouts, "process_restarts": self.process_restarts}
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._restart_process_pool(warm=False)
@@ -0,0 +1,272 @@
+"""Picks the tools worth showing the LLM for an utterance.
+
+Each tool is indexed as a TF-IDF vector over its name, description, parameter descriptions
+and docstring "Keywords:" line. An utterance is scored against every tool by cosine
+similarity, and only the top-k tools plus a fixed core set are sent with the request.
+Utterances that share no term with any tool (mostly chit-chat) get only the core set, so
+they do not pay for evaluating the full tool block.
+
+Evaluate recall of the correct tool on the built-in labelled sets with:
+
+    python -m kortex.tool_retrieval --top-k 6
+    python -m kortex.tool_retrieval --labels my_utterances.json   # [{"text": ..., "tool": ...}]
+
+EVAL_UTTERANCES was used while writing the "Keywords:" lines, so its recall is optimistic.
+HELDOUT_UTTERANCES was written separately and is never used for tuning: when a held-out
+utterance is missed, fix the keywords and move it to EVAL_UTTERANCES rather than rewording it.
+"""
+import argparse
+import json
+import re
+from collections import Counter
+
+import numpy as np
+import yaml
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the is are was be what whats who how me my i im you your to for of in on at and or it its "
+    "this that please can could would will do does with from by e g eg like".split()
+)
+
+# Labelled utterances for the recall evaluation; the tool is the one the LLM should call.
+# The keywords were tuned against this set.
+EVAL_UTTERANCES = [
+    ("what's the weather like in paris", "get_weather"),
+    ("is it going to rain today", "get_weather"),
+    ("how cold is it outside", "get_weather"),
+    ("how much is fifty dollars in euros", "convert_currency"),
+    ("convert 100 usd to yen", "convert_currency"),
+    ("where is the eiffel tower", "find_location"),
+    ("find pizza near me", "find_location"),
+    ("search for python tutorials", "search_web"),
+    ("look up the population of canada", "search_web"),
+    ("open youtube dot com", "open_website"),
+    ("go to github.com", "open_website"),
+    ("make a new folder called projects", "create_folder"),
+    ("open calculator", "find_application"),
+    ("launch spotify", "find_application"),
+    ("start photoshop", "find_application"),
+    ("turn the volume up to 80", "set_system_volume"),
+    ("make it quieter", "set_system_volume"),
+    ("dim the screen to 30 percent", "set_screen_brightness"),
+    ("set brightness to 70", "set_screen_brightness"),
+    ("set a timer for 10 minutes", "set_timer"),
+    ("start a countdown for 30 seconds", "set_timer"),
+    ("cancel my timer", "cancel_timer"),
+    ("type hello world", "write_text"),
+    ("what time is it", "get_current_time"),
+    ("what's today's date", "get_current_date"),
+    ("what day of the week is it", "get_current_date"),
+    ("what's the date 10 days from now", "calculate_future_date"),
+    ("how many days between 2024-01-01 and 2024-03-01", "calculate_days_between"),
+    ("what is 15 times 23", "calculate"),
+    ("calculate the square root of 144", "calculate"),
+    ("how many kilometers is 5 miles", "convert_units"),
+    ("convert 70 fahrenheit to celsius", "convert_units"),
+    ("tell me a joke", "tell_joke"),
+    ("make me laugh", "tell_joke"),
+    ("flip a coin", "flip_coin"),
+    ("heads or tails", "flip_coin"),
+    ("make a note that I parked on level 3", "create_note"),
+    ("remember that the wifi password is kortex", "create_note"),
+    ("read my last note", "read_notes"),
+    ("what are my notes", "read_notes"),
+    ("remind me to call mom in 10 minutes", "set_reminder"),
+    ("set a reminder for tomorrow morning to buy milk", "set_reminder"),
+    ("set an alarm for 7 am", "set_alarm"),
+    ("wake me up at 6", "set_alarm"),
+    ("send an email to john about the meeting", "prepare_email"),
+    ("write an email to sarah", "prepare_email"),
+]
+
+# Held out from keyword tuning; phrased the way people talk rather than after the docstrings.
+HELDOUT_UTTERANCES = [
+    ("do I need an umbrella in london tomorrow", "get_weather"),
+    ("what's it like out there right now", "get_weather"),
+    ("what's the forecast for the weekend", "get_weather"),
+    ("how many pounds do I get for 200 dollars", "convert_currency"),
+    ("what's the exchange rate between yen and won", "convert_currency"),
+    ("how do I get to the nearest train station", "find_location"),
+    ("show me coffee shops nearby", "find_location"),
+    ("google who won the world cup in 2018", "search_web"),
+    ("find out how tall mount everest is", "search_web"),
+    ("pull up wikipedia", "open_website"),
+    ("take me to reddit", "open_website"),
+    ("create a directory named invoices on my desktop", "create_folder"),
+    ("fire up chrome", "find_application"),
+    ("can you open notepad for me", "find_application"),
+    ("mute the sound", "set_system_volume"),
+    ("it's too loud, turn it down", "set_system_volume"),
+    ("my display is too bright", "set_screen_brightness"),
+    ("brighten the monitor a bit", "set_screen_brightness"),
+    ("give me five minutes on the clock", "set_timer"),
+    ("time my tea for three minutes", "set_timer"),
+    ("stop the countdown", "cancel_timer"),
+    ("type out thanks for your help", "write_text"),
+    ("do you know what hour it is", "get_current_time"),
+    ("what's the clock say", "get_current_time"),
+    ("which day is it today", "get_current_date"),
+    ("what month are we in", "get_current_date"),
+    ("what will the date be in three weeks", "calculate_future_date"),
+    ("how long until christmas 2026-12-25 from 2026-10-17", "calculate_days_between"),
+    ("what's 12 percent of 250", "calculate"),
+    ("add up 37 and 48", "calculate"),
+    ("how many ounces are in a liter", "convert_units"),
+    ("what is 6 feet in centimeters", "convert_units"),
+    ("say something funny", "tell_joke"),
+    ("I could use a laugh", "tell_joke"),
+    ("help me decide, heads or tails", "flip_coin"),
+    ("toss a coin for me", "flip_coin"),
+    ("jot down buy batteries", "create_note"),
+    ("save a note: dentist is on friday", "create_note"),
+    ("what did I write down last time", "read_notes"),
+    ("read back my notes", "read_notes"),
+    ("don't let me forget to water the plants tonight", "set_reminder"),
+    ("ping me about the call at 3 pm", "set_reminder"),
+    ("I need to get up at half past five", "set_alarm"),
+    ("set my morning alarm for 6:30", "set_alarm"),
+    ("draft a message to my boss saying I'm sick", "prepare_email"),
+    ("email the team that the release is delayed", "prepare_email"),
+]
+
+
+def _stem(word):
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [_stem(word) for word in _TOKEN.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _document(schema):
+    parts = [schema.name.replace('_', ' '), schema.description]
+    parts.extend(param.description for param in schema.parameters)
+    parts.extend(schema.keywords)
+    return " ".join(parts)
+
+
+class ToolRetriever:
+    def __init__(self, tool_schemas, top_k=6, core_tools=()):
+        self.tool_schemas = tool_schemas
+        self.top_k = top_k
+        self.names = list(tool_schemas.schemas)
+        self.core_tools = [name for name in core_tools if name in tool_schemas.schemas]
+        self.selections = 0
+        self.fallbacks = 0
+        self.tools_sent = 0
+
+        documents = [tokenize(_document(schema)) for schema in tool_schemas.schemas.values()]
+        self.vocabulary = {}
+        for document in documents:
+            for term in document:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for term, count in Counter(document).items():
+                counts[row, self.vocabulary[term]] = count
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1.0
+        weights = np.log1p(counts) * self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        self.matrix = weights / np.maximum(norms, 1e-9)
+
+    def scores(self, text):
+        """Cosine similarity between text and every tool, in registry order; all zero if no term is known."""
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term, count in Counter(tokenize(text)).items():
+            index = self.vocabulary.get(term)
+            if index is not None:
+                query[index] = np.log1p(count) * self.idf[index]
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.names), dtype=np.float32)
+        return self.matrix @ (query / norm)
+
+    def rank(self, text):
+        scores = self.scores(text)
+        order = np.argsort(-scores, kind='stable')
+        return [self.names[i] for i in order if scores[i] > 0]
+
+    def select(self, text):
+        """Returns the names of the tools to send for text: the core set plus the top-k matches."""
+        ranked = self.rank(text)
+        self.selections += 1
+        if not ranked:
+            self.fallbacks += 1
+        selected = set(self.core_tools) | set(ranked[:self.top_k])
+        self.tools_sent += len(selected)
+        # Registry order keeps the tool block identical for utterances that pick the same tools.
+        return [name for name in self.names if name in selected]
+
+    def stats(self):
+        return {
+            "selections": self.selections,
+            "fallbacks": self.fallbacks,
+            "mean_tools_sent": self.tools_sent / self.selections if self.selections else None,
+        }
+
+
+def evaluate(retriever, labelled, ks=(1, 3, 5)):
+    """Returns recall@k of the ranking alone, recall of the selected set and the misses."""
+    ranked_hits = Counter()
+    selected_hits = 0
+    tools_sent = 0
+    misses = []
+    for text, tool in labelled:
+        ranked = retriever.rank(text)
+        for k in ks:
+            ranked_hits[k] += tool in ranked[:k]
+        selected = retriever.select(text)
+        tools_sent += len(selected)
+        if tool in selected:
+            selected_hits += 1
+        else:
+            misses.append((text, tool, ranked[:3]))
+    total = len(labelled)
+    return {
+        "utterances": total,
+        "recall_at": {k: ranked_hits[k] / total for k in ks},
+        "selected_recall": selected_hits / total,
+        "mean_tools_sent": tools_sent / total,
+        "misses": misses,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure how often tool preselection keeps the right tool.")
+    parser.add_argument("--config", default="kortex/config.yaml")
+    parser.add_argument("--labels", help="JSON list of {\"text\": ..., \"tool\": ...} objects.")
+    parser.add_argument("--top-k", type=int, help="Overrides llm.tool_selection.top_k.")
+    args = parser.parse_args(argv)
+
+    from kortex.tools import build_tool_registry
+    from kortex.tools.schema import ToolSchemas
+
+    with open(args.config, 'r') as f:
+        selection_config = (yaml.safe_load(f).get('llm') or {}).get('tool_selection', {})
+    top_k = args.top_k or selection_config.get('top_k', 6)
+    retriever = ToolRetriever(ToolSchemas(build_tool_registry()), top_k, selection_config.get('core_tools', ()))
+
+    label_sets = [("tuning set", EVAL_UTTERANCES), ("held-out set", HELDOUT_UTTERANCES)]
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            label_sets = [(args.labels, [(item['text'], item['tool']) for item in json.load(f)])]
+
+    print(f"{len(retriever.names)} tools, top_k={top_k}, core={retriever.core_tools}")
+    for name, labelled in label_sets:
+        result = evaluate(retriever, labelled, ks=(1, 3, 5, top_k))
+        print(f"{name}: {result['utterances']} utterances")
+        for k, recall in sorted(result['recall_at'].items()):
+            print(f"  recall@{k}: {recall:.1%}")
+        print(f"  recall of selected set: {result['selected_recall']:.1%}, "
+              f"mean tools sent: {result['mean_tools_sent']:.1f}")
+        for text, tool, top in result['misses']:
+            print(f"  MISS '{text}': expected {tool}, ranked {top}")
+
+
+if __name__ == "__main__":
+    main()
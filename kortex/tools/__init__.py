@@ -0,0 +1,99 @@
+import ast
+import importlib
+import inspect
+import os
+
+# Tool name -> (module in kortex.tools, function name).
+TOOLS = {
+    "search_web": ("web", "search_web"), "get_weather": ("web", "get_weather"),
+    "find_location": ("web", "find_location"), "convert_currency": ("web", "convert_currency"),
+    "open_website": ("system", "open_website"), "create_folder": ("system", "create_folder"),
+    "find_application": ("system", "find_application"), "set_system_volume": ("system", "set_system_volume"),
+    "set_screen_brightness": ("system", "set_screen_brightness"),
+    "set_timer": ("productivity", "set_timer"), "cancel_timer": ("productivity", "cancel_timer"),
+    "write_text": ("productivity", "write_text"), "get_current_time": ("productivity", "get_current_time"),
+    "get_current_date": ("productivity", "get_current_date"),
+    "calculate_future_date": ("productivity", "calculate_future_date"),
+    "calculate_days_between": ("productivity", "calculate_days_between"),
+    "calculate": ("productivity", "calculate"), "convert_units": ("productivity", "convert_units"),
+    "tell_joke": ("productivity", "tell_joke"), "flip_coin": ("productivity", "flip_coin"),
+    "create_note": ("productivity", "create_note"), "read_notes": ("productivity", "read_notes"),
+    "set_reminder": ("productivity", "set_reminder"), "set_alarm": ("productivity", "set_alarm"),
+    "prepare_email": ("communication", "prepare_email")
+}
+
+_ANNOTATIONS = {"int": int, "float": float, "bool": bool, "str": str}
+_module_functions = {}
+
+
+def _parse_module(module):
+    """The function definitions of a tool module, read from its source without importing it."""
+    if module not in _module_functions:
+        path = os.path.join(os.path.dirname(__file__), f"{module}.py")
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        _module_functions[module] = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    return _module_functions[module]
+
+
+def _signature(node):
+    args = node.args
+    positional = args.posonlyargs + args.args
+    defaults = [inspect.Parameter.empty] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    kinds = [(arg, default, inspect.Parameter.POSITIONAL_OR_KEYWORD) for arg, default in zip(positional, defaults)]
+    kinds += [(arg, default or inspect.Parameter.empty, inspect.Parameter.KEYWORD_ONLY)
+              for arg, default in zip(args.kwonlyargs, args.kw_defaults)]
+    parameters = []
+    for arg, default, kind in kinds:
+        annotation = inspect.Parameter.empty
+        if arg.annotation is not None:
+            annotation = ast.unparse(arg.annotation)
+            annotation = _ANNOTATIONS.get(annotation, annotation)
+        if isinstance(default, ast.AST):
+            default = ast.literal_eval(default)
+        parameters.append(inspect.Parameter(arg.arg, kind, default=default, annotation=annotation))
+    return inspect.Signature(parameters)
+
+
+def load_tool(module, name):
+    """Imports kortex.tools.<module> and returns its tool function `name`."""
+    return getattr(importlib.import_module(f"kortex.tools.{module}"), name)
+
+
+class LazyTool:
+    """A tool function whose module is imported on its first call.
+
+    The docstring and signature are read from the module's source, so ToolSchemas can build the
+    tool's schema without importing it (or pyautogui, pint, pycaw, ... behind it). Pickling a
+    LazyTool, e.g. for the tool process pool, sends just the module and function name.
+    """
+
+    def __init__(self, module, name):
+        node = _parse_module(module)[name]
+        self.module = module
+        self.__name__ = name
+        self.__doc__ = ast.get_docstring(node)
+        self.__signature__ = _signature(node)
+        self._func = None
+
+    def load(self):
+        if self._func is None:
+            self._func = load_tool(self.module, self.__name__)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __reduce__(self):
+        return (load_tool, (self.module, self.__name__))
+
+    def __repr__(self):
+        return f"<tool kortex.tools.{self.module}.{self.__name__}>"
+
+
+def build_tool_registry():
+    """Returns the tools the LLM may call, keyed by the name it uses for them.
+
+    Nothing is imported here; each tool module loads the first time one of its tools runs.
+    """
+    return {name: LazyTool(module, func) for name, (module, func) in TOOLS.items()}
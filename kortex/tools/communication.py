@@ -1,15 +1,16 @@
-import smtplib
-from email.message import EmailMessage
 import yaml
 
 def prepare_email(recipient, subject, body=""):
     """
     Prepares an email for review before sending.
     Parameters: {"recipient": "The recipient's email address.", "subject": "The subject line of the email.", "body": "The main content of the email. Can be empty."}
+    Keywords: email mail send message write compose
     """
     return "Email drafted. Please review before sending."
 
 def send_email_final(recipient, subject, body, config_path="kortex/config.yaml"):
+    import smtplib
+    from email.message import EmailMessage
     try:
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
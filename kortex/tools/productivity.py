@@ -1,11 +1,7 @@
 import re
-import pyautogui
 import random
 import requests
 from datetime import datetime, timedelta
-from dateutil.parser import parse as parse_datetime
-from asteval import Interpreter as SafeEvaluator
-from pint import UnitRegistry
 from kortex import database
 
 
@@ -15,19 +11,24 @@ def tell_joke():
     """
     Tells a random joke.
     Parameters: {}
+    Keywords: joke funny laugh
+    Speakable: true
     """
     try:
         response = requests.get("https://official-joke-api.appspot.com/random_joke", timeout=5)
         response.raise_for_status()
         joke = response.json()
         return f"Here's a joke for you. {joke['setup']} ... {joke['punchline']}"
-    except requests.exceptions.RequestException as e:
-        return f"Sorry, I couldn't fetch a joke right now. Error: {e}"
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"Error fetching a joke: {e}")
+        return "Sorry, I couldn't fetch a joke right now."
 
 def flip_coin():
     """
     Flips a virtual coin.
     Parameters: {}
+    Keywords: flip coin toss heads tails
+    Speakable: true
     """
     result = random.choice(["Heads", "Tails"])
     return f"It's {result}."
@@ -39,20 +40,25 @@ def create_note(content):
     """
     Creates and saves a persistent note.
     Parameters: {"content": "The text content of the note."}
+    Keywords: note remember write down jot save
+    Speakable: true
     """
     try:
         database.add_note(content)
         return "Note saved."
     except Exception as e:
-        return f"Sorry, I couldn't save the note. Error: {e}"
+        print(f"Error saving note: {e}")
+        return "Sorry, I couldn't save the note."
 
-def read_notes(limit=1):
+def read_notes(limit: int = 1):
     """
     Reads the most recent note(s).
     Parameters: {"limit": "The number of recent notes to read. Defaults to 1."}
+    Keywords: notes read last note remember
+    Speakable: true
     """
     try:
-        notes = database.get_notes(limit=int(limit))
+        notes = database.get_notes(limit=limit)
         if not notes:
             return "You don't have any notes."
         if len(notes) == 1:
@@ -60,7 +66,8 @@ def read_notes(limit=1):
         response = "Here are your latest notes: " + "; ".join(notes)
         return response
     except Exception as e:
-        return f"Sorry, I couldn't read your notes. Error: {e}"
+        print(f"Error reading notes: {e}")
+        return "Sorry, I couldn't read your notes."
 
 
 # --- Timers, Alarms & Reminders ---
@@ -78,6 +85,7 @@ def _parse_natural_time(time_str):
         elif unit == "hour":
             return now + timedelta(hours=val)
 
+    from dateutil.parser import parse as parse_datetime
     try:
         due_time = parse_datetime(time_str, default=now)
 
@@ -95,6 +103,8 @@ def set_reminder(reminder_text, time_str):
     """
     Sets a reminder for a future time.
     Parameters: {"reminder_text": "The text of the reminder.", "time_str": "When to be reminded, e.g., 'in 10 minutes', 'at 8 PM', 'tomorrow morning'."}
+    Keywords: remind reminder remember later tomorrow
+    Speakable: true
     """
     due_at = _parse_natural_time(time_str)
     if not due_at:
@@ -103,12 +113,15 @@ def set_reminder(reminder_text, time_str):
         database.add_reminder(reminder_text, due_at)
         return f"Okay, I'll remind you to '{reminder_text}' at {due_at.strftime('%I:%M %p')}."
     except Exception as e:
-        return f"Error setting reminder: {e}"
+        print(f"Error setting reminder: {e}")
+        return "Sorry, I couldn't set that reminder."
 
 def set_alarm(time_str):
     """
     Sets an alarm for a future time.
     Parameters: {"time_str": "When to set the alarm, e.g., 'for 7 AM', 'in 1 hour'."}
+    Keywords: alarm wake me up morning
+    Speakable: true
     """
     due_at = _parse_natural_time(time_str)
     if not due_at:
@@ -117,7 +130,8 @@ def set_alarm(time_str):
         database.add_alarm(due_at)
         return f"Alarm set for {due_at.strftime('%I:%M %p')}."
     except Exception as e:
-        return f"Error setting alarm: {e}"
+        print(f"Error setting alarm: {e}")
+        return "Sorry, I couldn't set that alarm."
 
 def parse_duration(duration_str):
     """
@@ -137,6 +151,7 @@ def set_timer(duration_str):
     """
     Sets a countdown timer.
     Parameters: {"duration_str": "The duration of the timer, e.g., '10 minutes' or '1 hour 30 seconds'."}
+    Keywords: timer countdown minutes seconds hours
     """
     return f"Timer logic for '{duration_str}' is handled by the main application."
 
@@ -144,6 +159,7 @@ def cancel_timer():
     """
     Cancels the currently active timer.
     Parameters: {}
+    Keywords: cancel stop timer countdown
     """
     return "Timer cancellation is handled by the main application."
 
@@ -151,8 +167,10 @@ def write_text(text_to_write):
     """
     Types out the given text at the current cursor location.
     Parameters: {"text_to_write": "The text to be typed."}
+    Keywords: type write dictate text keyboard
     """
     try:
+        import pyautogui
         pyautogui.write(text_to_write, interval=0.01)
         return "Text written successfully."
     except Exception as e:
@@ -162,6 +180,8 @@ def get_current_time():
     """
     Gets the current time.
     Parameters: {}
+    Keywords: time clock hour now
+    Speakable: true
     """
     now = datetime.now()
     time_str = now.strftime("%I:%M %p").lstrip('0')
@@ -171,6 +191,8 @@ def get_current_date():
     """
     Gets the current date, including the day of the week.
     Parameters: {}
+    Keywords: date today day month year
+    Speakable: true
     """
     today = datetime.now()
     day = today.day
@@ -182,60 +204,92 @@ def get_current_date():
     date_str = today.strftime(f"%A, %B {day}{suffix}, %Y")
     return f"Today is {date_str}."
 
-def calculate_future_date(days):
+def calculate_future_date(days: int):
     """
     Calculates the date after a specific number of days from today.
     Parameters: {"days": "The number of days to add to the current date."}
+    Keywords: date days from now later future week
+    Speakable: true
     """
     try:
-        num_days = int(days)
-        future_date = datetime.now() + timedelta(days=num_days)
+        future_date = datetime.now() + timedelta(days=days)
         date_str = future_date.strftime("%A, %B %d, %Y")
-        return f"In {num_days} days, the date will be {date_str}."
-    except ValueError:
-        return "Please provide a valid number of days."
-    except Exception as e:
-        return f"An error occurred: {e}"
+        return f"In {days} days, the date will be {date_str}."
+    except (OverflowError, ValueError):
+        return f"Sorry, {days} days from now is outside the calendar I can work with."
 
 def calculate_days_between(start_date, end_date):
     """
     Calculates the number of days between two dates.
     Parameters: {"start_date": "The first date in YYYY-MM-DD format.", "end_date": "The second date in YYYY-MM-DD format."}
+    Keywords: days between until since dates how long
+    Speakable: true
     """
+    from dateutil.parser import parse as parse_datetime
     try:
         start = parse_datetime(start_date)
         end = parse_datetime(end_date)
         delta = abs((end - start).days)
         return f"There are {delta} days between {start_date} and {end_date}."
-    except ValueError:
+    except (ValueError, OverflowError):
         return "Sorry, I couldn't understand one of the dates. Please use the YYYY-MM-DD format."
     except Exception as e:
-        return f"An error occurred: {e}"
+        print(f"Error calculating days between dates: {e}")
+        return "Sorry, I couldn't work out the days between those dates."
 
 def calculate(expression):
     """
     Calculates the result of a mathematical expression.
     Parameters: {"expression": "The mathematical string to evaluate, e.g., '5 * (2 + 3)'."}
+    Keywords: calculate math plus minus times divided multiply add subtract square root percent
+    Speakable: true
+    Timeout: 3
+    Sandbox: process
     """
     try:
+        from asteval import Interpreter as SafeEvaluator
         evaluator = SafeEvaluator()
         result = evaluator.eval(expression)
+        # asteval records errors instead of raising them and returns None.
+        if evaluator.error or result is None:
+            return "Sorry, I couldn't calculate that."
         return f"The result is {result}."
     except Exception as e:
-        return f"Sorry, I couldn't calculate that. Error: {e}"
+        print(f"Error calculating '{expression}': {e}")
+        return "Sorry, I couldn't calculate that."
+
+_ureg = None
+
+def _unit_registry():
+    """Builds pint's unit registry on first use; it is slow to import and to construct."""
+    global _ureg
+    if _ureg is None:
+        from pint import UnitRegistry
+        _ureg = UnitRegistry()
+    return _ureg
+
+def warm_up():
+    """Loads what the sandboxed tools need; tool worker processes call it when they start."""
+    import asteval  # noqa: F401
+    _unit_registry()
 
-def convert_units(amount, from_unit, to_unit):
+def convert_units(amount: float, from_unit, to_unit):
     """
     Converts a value from one unit to another (e.g., length, mass, volume).
     Parameters: {"amount": "The numerical value to convert.", "from_unit": "The starting unit (e.g., 'miles', 'kg').", "to_unit": "The target unit (e.g., 'km', 'pounds')."}
+    Keywords: convert units miles kilometers kilograms pounds feet meters celsius fahrenheit liters
+    Speakable: true
+    Timeout: 5
+    Sandbox: process
     """
     try:
-        ureg = UnitRegistry()
+        ureg = _unit_registry()
         quantity = ureg(f"{amount} {from_unit}")
         converted_quantity = quantity.to(to_unit)
         if isinstance(converted_quantity.magnitude, float):
-            return f"{amount} {from_unit} is equal to {converted_quantity.magnitude:.2f} {to_unit}."
+            return f"{amount:g} {from_unit} is equal to {converted_quantity.magnitude:.2f} {to_unit}."
         else:
-            return f"{amount} {from_unit} is equal to {converted_quantity.magnitude} {to_unit}."
+            return f"{amount:g} {from_unit} is equal to {converted_quantity.magnitude} {to_unit}."
     except Exception as e:
-        return f"Sorry, I couldn't perform that conversion. Error: {e}"
\ No newline at end of file
+        print(f"Error converting {amount} {from_unit} to {to_unit}: {e}")
+        return f"Sorry, I couldn't convert {from_unit} to {to_unit}."
\ No newline at end of file
@@ -0,0 +1,152 @@
+import hashlib
+import inspect
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+
+_JSON_TYPES = {int: "integer", float: "number", bool: "boolean", str: "string"}
+
+
+@dataclass(frozen=True)
+class ToolParameter:
+    name: str
+    type: str
+    description: str
+    required: bool
+    default: object = None
+
+
+@dataclass(frozen=True)
+class ToolSchema:
+    name: str
+    description: str
+    parameters: tuple
+    keywords: tuple = ()
+    speakable: bool = False
+    timeout: float = None
+    sandbox: str = "thread"
+
+    def definition(self):
+        properties = {p.name: {"type": p.type, "description": p.description} for p in self.parameters}
+        parameters = {"type": "object", "properties": properties}
+        required = [p.name for p in self.parameters if p.required]
+        if required:
+            parameters["required"] = required
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": parameters}
+        }
+
+
+class ToolSchemas:
+    """Schemas for a tool registry, compiled once.
+
+    The description and parameter descriptions come from each tool's docstring (first line and
+    the "Parameters:" JSON line); types, defaults and required flags come from its signature.
+    An optional "Keywords:" line lists extra words used for tool retrieval, and "Speakable: true"
+    marks a tool whose result is always a sentence that can be read out as-is. Such a tool must
+    fail with a sentence too: it logs the exception and never puts its text in the result.
+    "Timeout:" gives
+    the seconds the tool may run and "Sandbox: process" moves a CPU-bound tool into a worker
+    process (see ToolExecutor). None of these are sent to the model.
+    Only parameters listed in the docstring are exposed to the model, so internal arguments
+    like find_application's apps_cache stay hidden.
+    """
+
+    def __init__(self, tool_registry):
+        schemas = {name: _compile_tool(name, func) for name, func in tool_registry.items()}
+        self.schemas = MappingProxyType(schemas)
+        self.definitions = tuple(schema.definition() for schema in schemas.values())
+        self.payload = json.dumps(self.definitions, separators=(',', ':'), sort_keys=True)
+        self.hash = hashlib.sha1(self.payload.encode('utf-8')).hexdigest()[:12]
+
+    def is_speakable(self, tool_name):
+        schema = self.schemas.get(tool_name)
+        return schema is not None and schema.speakable
+
+    def definitions_for(self, tool_names):
+        """Returns the definitions of the named tools, in registry order."""
+        tool_names = set(tool_names)
+        return tuple(d for d in self.definitions if d["function"]["name"] in tool_names)
+
+    def coerce_arguments(self, tool_name, arguments):
+        """Validates model-supplied arguments and converts them to the declared types.
+
+        Unknown arguments are dropped; a missing required argument or an unconvertible value
+        raises ValueError.
+        """
+        schema = self.schemas[tool_name]
+        arguments = arguments or {}
+        coerced = {}
+        for param in schema.parameters:
+            value = arguments.get(param.name)
+            if value is None or value == "":
+                if param.required:
+                    raise ValueError(f"Missing required argument '{param.name}' for {tool_name}.")
+                continue
+            coerced[param.name] = _coerce(value, param.type, param.name)
+        return coerced
+
+
+def _compile_tool(name, func):
+    doc_lines = (func.__doc__ or "").strip().split('\n')
+    description = doc_lines[0].strip()
+    params_line = next((line for line in doc_lines if "Parameters:" in line), None)
+    param_docs = {}
+    if params_line:
+        try:
+            param_docs = json.loads(params_line.split("Parameters:")[1].strip())
+        except (json.JSONDecodeError, IndexError):
+            print(f"Warning: Could not parse parameters for tool '{name}'")
+    keywords_line = next((line for line in doc_lines if "Keywords:" in line), "")
+    keywords = tuple(keywords_line.split("Keywords:")[1].split()) if keywords_line else ()
+    speakable_line = next((line for line in doc_lines if "Speakable:" in line), "")
+    speakable = speakable_line.split("Speakable:")[1].strip().lower() in ("true", "yes") if speakable_line else False
+    timeout_line = next((line for line in doc_lines if "Timeout:" in line), "")
+    timeout = None
+    if timeout_line:
+        try:
+            timeout = float(timeout_line.split("Timeout:")[1].strip())
+        except ValueError:
+            print(f"Warning: Could not parse timeout for tool '{name}'")
+    sandbox_line = next((line for line in doc_lines if "Sandbox:" in line), "")
+    sandbox = sandbox_line.split("Sandbox:")[1].strip().lower() if sandbox_line else "thread"
+
+    signature = inspect.signature(func)
+    parameters = []
+    for param_name, doc in param_docs.items():
+        param = signature.parameters.get(param_name)
+        if param is None:
+            print(f"Warning: Tool '{name}' documents unknown parameter '{param_name}'")
+            continue
+        has_default = param.default is not inspect.Parameter.empty
+        if param.annotation is not inspect.Parameter.empty:
+            json_type = _JSON_TYPES.get(param.annotation, "string")
+        elif has_default and param.default is not None:
+            json_type = _JSON_TYPES.get(type(param.default), "string")
+        else:
+            json_type = "string"
+        parameters.append(ToolParameter(
+            name=param_name, type=json_type, description=doc,
+            required=not has_default, default=param.default if has_default else None
+        ))
+    return ToolSchema(name=name, description=description, parameters=tuple(parameters),
+                      keywords=keywords, speakable=speakable, timeout=timeout, sandbox=sandbox)
+
+
+def _coerce(value, json_type, param_name):
+    try:
+        if json_type == "integer":
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError
+            return int(number)
+        if json_type == "number":
+            return float(value)
+        if json_type == "boolean":
+            if isinstance(value, str):
+                return value.strip().lower() in ("true", "yes", "1", "on")
+            return bool(value)
+        return value if isinstance(value, str) else str(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Argument '{param_name}' should be of type {json_type}, got {value!r}.")
@@ -2,10 +2,6 @@ import os
 import json
 import webbrowser
 import subprocess
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-import screen_brightness_control as sbc
 
 APP_ALIASES = {
     "calculator": "calc.exe",
@@ -17,6 +13,7 @@ def find_application(app_query, apps_cache):
     """
     Finds application names from a cached list that match a query, checking aliases first.
     Parameters: {"app_query": "The name of the application to find, e.g., 'calculator' or 'photoshop'."}
+    Keywords: open launch start run app application program
     """
     app_query = app_query.lower()
     matches = set()
@@ -81,21 +78,26 @@ def create_folder(folder_name):
     """
     Creates a new folder on the user's desktop.
     Parameters: {"folder_name": "The name for the new folder."}
+    Keywords: make new folder directory desktop
+    Speakable: true
     """
-    desktop_path = os.path.join(os.path.join(os.environ['USERPROFILE']), 'Desktop')
-    path_to_create = os.path.join(desktop_path, folder_name)
     try:
+        desktop_path = os.path.join(os.path.join(os.environ['USERPROFILE']), 'Desktop')
+        path_to_create = os.path.join(desktop_path, folder_name)
         os.makedirs(path_to_create)
         return f"Folder '{folder_name}' created on your desktop."
     except FileExistsError:
         return f"A folder named '{folder_name}' already exists on your desktop."
     except Exception as e:
-        return f"Error creating folder: {e}"
+        print(f"Error creating folder '{folder_name}': {e}")
+        return f"Sorry, I couldn't create a folder named '{folder_name}'."
 
 def open_website(url):
     """
     Opens a given URL in the default web browser.
     Parameters: {"url": "The full URL of the website to open, e.g., 'https://www.google.com'."}
+    Keywords: open website site page url browser go to dot com
+    Speakable: true
     """
     try:
         # Prepend https:// if the url doesn't have a scheme
@@ -104,18 +106,23 @@ def open_website(url):
         webbrowser.open(url)
         return f"Opening {url}."
     except Exception as e:
-        return f"Sorry, I couldn't open that URL. Error: {e}"
+        print(f"Error opening '{url}': {e}")
+        return "Sorry, I couldn't open that website."
 
-def set_system_volume(level):
+def set_system_volume(level: int):
     """
     Sets the system master volume to a specific percentage.
     Parameters: {"level": "A number between 0 and 100 for the desired volume level."}
+    Keywords: volume sound louder quieter mute loud audio
     """
     try:
-        level = int(level)
         if not 0 <= level <= 100:
             return "Volume level must be between 0 and 100."
-            
+
+        # pycaw and comtypes are only loaded once the volume is actually changed.
+        from ctypes import cast, POINTER
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
         devices = AudioUtilities.GetSpeakers()
         interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
         volume = cast(interface, POINTER(IAudioEndpointVolume))
@@ -126,18 +133,22 @@ def set_system_volume(level):
     except Exception as e:
         return f"Failed to set volume. Error: {e}"
 
-def set_screen_brightness(level):
+def set_screen_brightness(level: int):
     """
     Sets the screen brightness to a specific percentage.
     Parameters: {"level": "A number between 0 and 100 for the desired brightness level."}
+    Keywords: brightness screen display dim brighter darker
     """
     try:
-        level = int(level)
         if not 0 <= level <= 100:
             return "Brightness level must be between 0 and 100."
-        
+
+        import screen_brightness_control as sbc
         sbc.set_brightness(level)
         return f"Screen brightness set to {level}%."
+    except ImportError as e:
+        # Caught before the clause below, which needs sbc to have been imported.
+        return f"Screen brightness control is not available. Error: {e}"
     except sbc.ScreenBrightnessError as e:
         return f"Failed to set brightness. This may not be supported on your display. Error: {e}"
     except Exception as e:
@@ -10,6 +10,8 @@ def search_web(query):
     """
     Searches the web using the default browser.
     Parameters: {"query": "The search term."}
+    Keywords: search google look up find online internet browse who is what is
+    Speakable: true
     """
     url = f"https://www.google.com/search?q={query}"
     webbrowser.open(url)
@@ -19,6 +21,8 @@ def get_weather(location=None):
     """
     Gets current weather. Uses the user's IP for location if not specified.
     Parameters: {"location": "The city for the weather, e.g., 'London'. Leave blank for your current location."}
+    Keywords: weather temperature forecast rain snow sunny hot cold outside umbrella
+    Speakable: true
     """
     try:
         with open("kortex/config.yaml", 'r') as f:
@@ -46,7 +50,7 @@ def get_weather(location=None):
             if not iplocate_api_key:
                 return "IPLocate.io API key is missing. Cannot determine current location."
 
-            ip_response = requests.get(f"https://iplocate.io/api/lookup?apikey={iplocate_api_key}")
+            ip_response = requests.get(f"https://iplocate.io/api/lookup?apikey={iplocate_api_key}", timeout=4)
             ip_response.raise_for_status()
             ip_data = ip_response.json()
             city = ip_data.get('city')
@@ -57,7 +61,7 @@ def get_weather(location=None):
             
         find_url = "https://www.meteosource.com/api/v1/free/find_places"
         find_params = {'text': target_location, 'key': weather_api_key}
-        find_response = requests.get(find_url, params=find_params)
+        find_response = requests.get(find_url, params=find_params, timeout=4)
         find_response.raise_for_status()
         places = find_response.json()
         
@@ -69,7 +73,7 @@ def get_weather(location=None):
 
         weather_url = "https://www.meteosource.com/api/v1/free/point"
         weather_params = {'place_id': place_id, 'sections': 'current', 'units': 'auto', 'key': weather_api_key}
-        weather_response = requests.get(weather_url, params=weather_params)
+        weather_response = requests.get(weather_url, params=weather_params, timeout=4)
         weather_response.raise_for_status()
         data = weather_response.json()
         
@@ -85,14 +89,18 @@ def get_weather(location=None):
         return f"The current weather in {location_desc} is {summary.lower()} with a temperature of {temp}{units}."
 
     except requests.exceptions.RequestException as e:
-        return f"A network error occurred: {e}"
+        print(f"Weather request failed: {e}")
+        return "Sorry, I couldn't reach the weather service right now."
     except Exception as e:
-        return f"An unexpected error occurred: {e}"
+        print(f"Error getting the weather: {e}")
+        return "Sorry, I couldn't get the weather right now."
 
-def convert_currency(amount, from_currency, to_currency):
+def convert_currency(amount: float, from_currency, to_currency):
     """
     Converts an amount from one currency to another using real-time exchange rates.
     Parameters: {"amount": "The numerical value to convert.", "from_currency": "The 3-letter currency code to convert from (e.g., 'USD').", "to_currency": "The 3-letter currency code to convert to (e.g., 'EUR')."}
+    Keywords: currency exchange rate money dollars euros pounds yen rupees worth
+    Speakable: true
     """
     try:
         with open("kortex/config.yaml", 'r') as f: config = yaml.safe_load(f)
@@ -107,7 +115,7 @@ def convert_currency(amount, from_currency, to_currency):
         url = "https://api.currencyfreaks.com/v2.0/rates/latest"
         params = {'apikey': api_key, 'symbols': f'{from_curr},{to_curr}'}
         
-        response = requests.get(url, params=params)
+        response = requests.get(url, params=params, timeout=4)
         response.raise_for_status()
         data = response.json()
 
@@ -115,7 +123,6 @@ def convert_currency(amount, from_currency, to_currency):
         if from_curr not in rates or to_curr not in rates:
             return f"Could not get exchange rates for {from_curr} or {to_curr}."
 
-        amount = float(amount)
         from_rate = float(rates[from_curr])
         to_rate = float(rates[to_curr])
         
@@ -125,14 +132,18 @@ def convert_currency(amount, from_currency, to_currency):
         return f"{amount:.2f} {from_curr} is approximately {converted_amount:.2f} {to_curr}."
 
     except requests.exceptions.HTTPError as e:
-        return f"API Error: {e.response.status_code} - {e.response.text}"
+        print(f"Currency API error: {e.response.status_code} - {e.response.text}")
+        return "Sorry, the currency service turned down the request. Please check the API key in the settings."
     except Exception as e:
-        return f"An error occurred during currency conversion: {e}"
+        print(f"Error converting currency: {e}")
+        return "Sorry, I couldn't convert that currency right now."
 
 def find_location(location_query):
     """
     Finds a location on a map and opens it in the browser. Handles 'near me' queries by finding the user's city via their IP.
     Parameters: {"location_query": "The place, address, or point of interest to find (e.g., 'Eiffel Tower' or 'pizza near me')."}
+    Keywords: map where directions nearby near me restaurant place address navigate
+    Speakable: true
     """
     try:
         with open("kortex/config.yaml", 'r') as f: config = yaml.safe_load(f)
@@ -146,7 +157,7 @@ def find_location(location_query):
             api_key = service_config.get('iplocate_api_key')
             if not api_key: return "IPLocate.io API key is missing in settings."
 
-            ip_response = requests.get(f"https://iplocate.io/api/lookup?apikey={api_key}")
+            ip_response = requests.get(f"https://iplocate.io/api/lookup?apikey={api_key}", timeout=4)
             ip_response.raise_for_status()
             ip_data = ip_response.json()
             city = ip_data.get('city')
@@ -161,7 +172,7 @@ def find_location(location_query):
         geocode_url = "https://nominatim.openstreetmap.org/search"
         params = {'q': search_query, 'format': 'json', 'limit': 1}
         
-        geo_response = requests.get(geocode_url, params=params, headers=headers)
+        geo_response = requests.get(geocode_url, params=params, headers=headers, timeout=4)
         geo_response.raise_for_status()
         geo_data = geo_response.json()
         
@@ -174,6 +185,8 @@ def find_location(location_query):
         return f"Showing results for '{search_query}' on the map."
 
     except requests.exceptions.RequestException as e:
-        return f"A network error occurred while finding the location: {e}"
+        print(f"Location request failed: {e}")
+        return "Sorry, I couldn't reach the map service right now."
     except Exception as e:
-        return f"An unexpected error occurred while finding the location: {e}"
\ No newline at end of file
+        print(f"Error finding location '{location_query}': {e}")
+        return "Sorry, I couldn't find that location."
\ No newline at end of file
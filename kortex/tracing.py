@@ -0,0 +1,219 @@
+"""Latency tracing for one spoken interaction, from the wake word to the last audible word.
+
+Spans are written to a rotating JSONL log and a Chrome trace_event file per session, which can
+be opened in chrome://tracing or https://ui.perfetto.dev. Every span carries the id of the
+interaction it belongs to. Enable it in the config:
+
+    tracing:
+      enabled: true
+      dir: traces
+
+With tracing disabled, span() returns a shared no-op object and record() returns immediately, so
+the instrumented code pays for a global lookup and nothing else. Spans are written by a
+background thread, never by the code being traced.
+
+The current interaction lives in a context variable. Threads do not inherit it, so work handed
+to another thread carries it along: pipeline stages restore it for each queued item, and speech
+requests, speech streams and speculations remember the one they were created in. Work started
+by the reminder and alarm scheduler belongs to no interaction.
+"""
+import contextlib
+import contextvars
+import glob
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+_tracer = None
+_interactions = itertools.count(1)
+_interaction = contextvars.ContextVar("kortex_interaction", default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed block; use as a context manager. set() adds arguments before it closes."""
+
+    def __init__(self, tracer, name, interaction, args):
+        self.tracer = tracer
+        self.name = name
+        self.interaction = interaction
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = str(exc) or exc_type.__name__
+        self.tracer.emit(self.name, self.start, time.perf_counter(), self.interaction, self.args)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def __init__(self, tracer):
+        super().__init__()
+        self.tracer = tracer
+
+    def format(self, record):
+        span = record.span
+        return json.dumps({
+            "session": self.tracer.session,
+            "interaction": span["interaction"],
+            "name": span["name"],
+            "start": datetime.fromtimestamp(self.tracer.wall_time(span["start"])).isoformat(timespec="microseconds"),
+            "duration_ms": round(1000.0 * (span["end"] - span["start"]), 3),
+            "thread": span["thread"],
+            "args": span["args"],
+        }, default=str)
+
+
+class _ChromeTraceFormatter(logging.Formatter):
+    """Formats spans as complete ("X") trace events; the file is a JSON array left open at the end,
+    which the trace viewers accept."""
+
+    def __init__(self, tracer):
+        super().__init__()
+        self.tracer = tracer
+        self._named_threads = set()
+
+    def format(self, record):
+        span = record.span
+        pid = os.getpid()
+        events = []
+        if span["tid"] not in self._named_threads:
+            self._named_threads.add(span["tid"])
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": span["tid"],
+                           "args": {"name": span["thread"]}})
+        events.append({
+            "name": span["name"], "cat": span["name"].split(".")[0], "ph": "X", "pid": pid, "tid": span["tid"],
+            "ts": round(1e6 * (span["start"] - self.tracer.origin), 1),
+            "dur": round(1e6 * (span["end"] - span["start"]), 1),
+            "args": dict(span["args"], interaction=span["interaction"]),
+        })
+        return ",\n".join(json.dumps(event, default=str) for event in events) + ","
+
+
+class Tracer:
+    def __init__(self, directory="traces", max_bytes=5 * 1024 * 1024, backup_count=3, keep_traces=5):
+        os.makedirs(directory, exist_ok=True)
+        self.origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self.session = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+        jsonl = logging.handlers.RotatingFileHandler(
+            os.path.join(directory, "kortex-trace.jsonl"), maxBytes=max_bytes, backupCount=backup_count,
+            encoding="utf-8"
+        )
+        jsonl.setFormatter(_JsonLinesFormatter(self))
+        # Keep the newest keep_traces session traces, counting the one started now.
+        for old in sorted(glob.glob(os.path.join(directory, "kortex-*.trace.json")))[:-(keep_traces - 1) or None]:
+            os.remove(old)
+        self.chrome_path = os.path.join(directory, f"kortex-{self.session}.trace.json")
+        chrome = logging.FileHandler(self.chrome_path, mode="w", encoding="utf-8")
+        chrome.stream.write("[\n")
+        chrome.setFormatter(_ChromeTraceFormatter(self))
+
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, jsonl, chrome)
+        self._listener.start()
+
+    def wall_time(self, perf_time):
+        return self._wall_origin + (perf_time - self.origin)
+
+    def emit(self, name, start, end, interaction, args):
+        thread = threading.current_thread()
+        self._queue.put(logging.makeLogRecord({"span": {
+            "name": name, "start": start, "end": end, "interaction": interaction, "args": args,
+            "thread": thread.name, "tid": thread.ident,
+        }}))
+
+    def close(self):
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        print(f"Trace written to {self.chrome_path}")
+
+
+def configure(config):
+    """Starts tracing if the loaded config's `tracing:` section enables it."""
+    global _tracer
+    settings = (config or {}).get('tracing') or {}
+    if _tracer is not None or not settings.get('enabled', False):
+        return
+    _tracer = Tracer(
+        directory=settings.get('dir', 'traces'),
+        max_bytes=int(settings.get('max_megabytes', 5) * 1024 * 1024),
+        backup_count=settings.get('backup_count', 3),
+        keep_traces=settings.get('keep_traces', 5)
+    )
+    print(f"Tracing to {_tracer.chrome_path}")
+
+
+def enabled():
+    return _tracer is not None
+
+
+def begin_interaction():
+    """Starts a new interaction in the calling thread; its spans from now on belong to it."""
+    interaction = next(_interactions)
+    _interaction.set(interaction)
+    return interaction
+
+
+def current_interaction():
+    return _interaction.get()
+
+
+@contextlib.contextmanager
+def in_interaction(interaction):
+    """Attributes the spans of the block to interaction, e.g. on a thread doing work for it."""
+    token = _interaction.set(interaction)
+    try:
+        yield
+    finally:
+        _interaction.reset(token)
+
+
+def span(name, interaction=None, **args):
+    """Times a block: `with tracing.span("llm.chat", model=...) as s: ... s.set(tokens=n)`."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, interaction if interaction is not None else _interaction.get(), args)
+
+
+def record(name, start, end, interaction=None, **args):
+    """Records a span whose perf_counter() start and end were measured elsewhere."""
+    if _tracer is None or start is None or end is None:
+        return
+    _tracer.emit(name, start, end, interaction if interaction is not None else _interaction.get(), args)
+
+
+def close():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
@@ -1,50 +1,612 @@
 import subprocess
 import yaml
 import os
-import tempfile
-import winsound
+import io
+import hashlib
+import json
+import shutil
+import queue
+import re
+import threading
+import time
+import wave
+from collections import OrderedDict
+from kortex.playback import create_backend
+from kortex import tracing
+
+
+def voice_sample_rate(voice_path):
+    """Reads the output sample rate from the .onnx.json file Piper ships next to each voice."""
+    try:
+        with open(f"{voice_path}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)['audio']['sample_rate']
+    except (OSError, KeyError, ValueError):
+        return 22050
+
+
+_SENTENCE_END = re.compile(r'(?<=[.!?:])\s+|\n+')
+
+
+def split_sentences(text):
+    """Splits a reply into sentences so they can be synthesized one at a time."""
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def iter_sentences(fragments):
+    """Yields complete sentences from an iterable of text fragments, such as LLM token deltas.
+
+    A sentence is cut only once whitespace follows its punctuation, so "3.5" is never split;
+    whatever is left when the fragments run out is yielded as the last sentence.
+    """
+    pending = ""
+    for fragment in fragments:
+        pending += fragment
+        parts = _SENTENCE_END.split(pending)
+        for sentence in parts[:-1]:
+            if sentence.strip():
+                yield sentence.strip()
+        pending = parts[-1]
+    if pending.strip():
+        yield pending.strip()
+
+
+def pcm_to_wav(pcm, sample_rate):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class PiperWorker:
+    """A long-lived Piper process for one voice.
+
+    Text goes in as one JSON object per line (--json-input) and raw 16-bit PCM comes back on
+    stdout (--output-raw), so the ONNX model is loaded once instead of for every sentence.
+    Piper logs a "Real-time factor ... audio=<seconds> sec" line on stderr after each
+    utterance, which tells us how many bytes belong to it.
+    """
+
+    _AUDIO_SECONDS = re.compile(r"audio=([\d.]+)")
+
+    def __init__(self, piper_path, voice_path, timeout=15.0):
+        self.piper_path = piper_path
+        self.voice_path = voice_path
+        self.sample_rate = voice_sample_rate(voice_path)
+        self.timeout = timeout
+        self.process = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._stderr_tail = []
+        self.start()
+
+    def start(self):
+        command = [self.piper_path, '-m', self.voice_path, '--json-input', '--output-raw']
+        # Both reader threads feed one queue: PCM arrives as bytes, end-of-utterance as the
+        # logged audio duration in seconds.
+        self._output = queue.Queue()
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            bufsize=0, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        threading.Thread(target=self._read_stdout, args=(self.process, self._output), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self.process, self._output), daemon=True).start()
+
+    def _read_stdout(self, process, output):
+        while True:
+            data = process.stdout.read(8192)
+            if not data:
+                output.put(None)
+                return
+            output.put(data)
+
+    def _read_stderr(self, process, output):
+        for raw_line in process.stderr:
+            line = raw_line.decode('utf-8', errors='replace').strip()
+            self._stderr_tail = (self._stderr_tail + [line])[-5:]
+            match = self._AUDIO_SECONDS.search(line)
+            if "Real-time factor" in line and match:
+                output.put(float(match.group(1)))
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def restart(self):
+        self.close()
+        self.restarts += 1
+        print(f"Restarting Piper worker for {os.path.basename(self.voice_path)} (restart #{self.restarts}).")
+        self.start()
+
+    def synthesize_stream(self, text):
+        """Yields raw PCM chunks for text as soon as Piper produces them.
+
+        Returns (as the generator's StopIteration value) the byte count Piper reported for the
+        utterance, so callers can tell a complete utterance from one that was cut short.
+        """
+        with self._lock:
+            if not self.is_alive():
+                self.restart()
+            self._drain()
+
+            try:
+                self.process.stdin.write((json.dumps({"text": text}) + "\n").encode('utf-8'))
+                self.process.stdin.flush()
+            except OSError:
+                self.restart()
+                raise RuntimeError("Piper worker stopped accepting input.")
+
+            deadline = time.monotonic() + self.timeout
+            self._expected_bytes = None
+            self._received = 0
+            finished = False
+            try:
+                for item in self._utterance_output(deadline):
+                    yield item
+                finished = True
+                return self._expected_bytes
+            except RuntimeError:
+                # The worker has already been restarted; there is nothing left to swallow.
+                finished = True
+                raise
+            finally:
+                if not finished and self.is_alive():
+                    # The caller stopped early; swallow the rest so it does not leak into the next request.
+                    for _ in self._utterance_output(deadline):
+                        pass
+
+    def slack_bytes(self):
+        """Tolerated rounding in the logged duration (10 ms of audio)."""
+        return int(self.sample_rate * 0.01) * 2
+
+    def _utterance_output(self, deadline):
+        slack = self.slack_bytes()
+        while self._expected_bytes is None or self._received < self._expected_bytes - slack:
+            # The duration line on stderr can overtake the last PCM on stdout, so keep waiting for
+            # the reported length; a busy machine may pause the reader well past a few ms.
+            try:
+                item = self._output.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                received, expected = self._received, self._expected_bytes
+                self.restart()
+                if expected is not None:
+                    raise RuntimeError(f"Piper sent {received} of {expected} bytes within {self.timeout} seconds.")
+                raise RuntimeError(f"Piper did not finish within {self.timeout} seconds.")
+
+            if item is None:
+                raise RuntimeError(f"Piper exited unexpectedly: {' | '.join(self._stderr_tail)}")
+            if isinstance(item, float):
+                self._expected_bytes = int(item * self.sample_rate) * 2
+                continue
+            self._received += len(item)
+            yield item
+
+    def _drain(self):
+        while not self._output.empty():
+            self._output.get_nowait()
+
+    def check_health(self):
+        """Restarts the process if it has died; returns True if it was already healthy."""
+        if self.is_alive():
+            return True
+        self.restart()
+        return False
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+
+class PiperPool:
+    """Keeps at most max_workers Piper processes alive, keyed by voice id (least recently used is evicted)."""
+
+    def __init__(self, piper_path, voices, max_workers=2, timeout=15.0):
+        self.piper_path = piper_path
+        self.voices = voices
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._workers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, voice_id):
+        with self._lock:
+            worker = self._workers.get(voice_id)
+            if worker is None:
+                worker = PiperWorker(self.piper_path, self.voices[voice_id], timeout=self.timeout)
+                self._workers[voice_id] = worker
+                while len(self._workers) > self.max_workers:
+                    _, evicted = self._workers.popitem(last=False)
+                    evicted.close()
+            self._workers.move_to_end(voice_id)
+            return worker
+
+    def check_health(self):
+        with self._lock:
+            return {voice_id: worker.check_health() for voice_id, worker in self._workers.items()}
+
+    def close(self):
+        with self._lock:
+            for worker in self._workers.values():
+                worker.close()
+            self._workers.clear()
+
+
+class PhraseCache:
+    """Synthesized audio keyed by (voice id, normalized text).
+
+    A byte-bounded in-memory LRU sits in front of an on-disk store of WAV files that survives
+    restarts. Disk entries live under a directory named after the voice model's size and
+    modification time, so replacing the .onnx file invalidates them.
+    """
+
+    def __init__(self, cache_dir, max_bytes=32 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.split())
+
+    @staticmethod
+    def _fingerprint(voice_path):
+        stat = os.stat(voice_path)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _voice_dir(self, voice_id, voice_path):
+        return os.path.join(self.cache_dir, voice_id, self._fingerprint(voice_path))
+
+    def _key(self, voice_id, voice_path, text):
+        return (voice_id, self._fingerprint(voice_path), self.normalize(text))
+
+    def _file_path(self, key):
+        digest = hashlib.sha1(key[2].encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[0], key[1], f"{digest}.wav")
+
+    def get(self, voice_id, voice_path, text):
+        """Returns (pcm, sample_rate) or None."""
+        try:
+            key = self._key(voice_id, voice_path, text)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        path = self._file_path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        with wave.open(path, 'rb') as wav:
+            entry = (wav.readframes(wav.getnframes()), wav.getframerate())
+        self.hits += 1
+        self._remember(key, entry)
+        return entry
+
+    def put(self, voice_id, voice_path, text, pcm, sample_rate, persist=False):
+        try:
+            key = self._key(voice_id, voice_path, text)
+        except OSError:
+            return
+        self._remember(key, (pcm, sample_rate))
+        if persist:
+            path = self._file_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(pcm_to_wav(pcm, sample_rate))
+
+    def _remember(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self._size += len(entry[0])
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (evicted_pcm, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted_pcm)
+
+    def prune_stale(self, voice_id, voice_path):
+        """Deletes disk entries recorded for older versions of this voice model."""
+        voice_root = os.path.join(self.cache_dir, voice_id)
+        if not os.path.isdir(voice_root):
+            return
+        current = self._fingerprint(voice_path)
+        for name in os.listdir(voice_root):
+            if name != current:
+                shutil.rmtree(os.path.join(voice_root, name), ignore_errors=True)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+class SpeechStream:
+    """A reply spoken sentence by sentence.
+
+    A producer thread synthesizes sentences into a small playback queue while play() streams
+    them to the playback backend in order, so sentence N+1 is being synthesized while sentence
+    N is audible. The sentence source may be any iterable, including one that is still being
+    generated. After cancel(), remaining() gives the sentences that were not heard in full.
+    """
+
+    def __init__(self, tts, sentences, voice_id, queue_size=16):
+        self.tts = tts
+        self.voice_id = voice_id
+        self.metrics = []
+        self.time_to_first_audio_ms = None
+        self._source = iter(sentences)
+        self._pulled = []
+        self._spoken = 0
+        self._ready = queue.Queue(maxsize=queue_size)
+        self._cancelled = threading.Event()
+        self._start = time.perf_counter()
+        self.interaction = tracing.current_interaction()
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._producer.start()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _produce(self):
+        # A reply stream's LLM spans are recorded here, as the producer reads the sentences.
+        with tracing.in_interaction(self.interaction):
+            self._produce_sentences()
+
+    def _produce_sentences(self):
+        try:
+            for sentence in self._source:
+                # Recorded before the cancel check, so remaining() does not lose it.
+                self._pulled.append(sentence)
+                if self.cancelled:
+                    break
+                index = len(self._pulled) - 1
+                synth_start = time.perf_counter()
+                blocked = 0.0
+                try:
+                    for pcm, sample_rate in self.tts.synthesize_chunks(sentence, self.voice_id):
+                        blocked += self._put(("audio", pcm, sample_rate))
+                        if self.cancelled:
+                            break
+                except RuntimeError as e:
+                    print(f"Error running Piper TTS: {e}")
+                    continue
+                synth_end = time.perf_counter()
+                synth_ms = 1000.0 * (synth_end - synth_start - blocked)
+                tracing.record("tts.synthesis", synth_start, synth_end, self.interaction,
+                               chars=len(sentence), blocked_ms=1000.0 * blocked)
+                self._put(("end", {"text": sentence, "synth_ms": synth_ms, "index": index}))
+        finally:
+            self._put(None)
+
+    def _put(self, item):
+        """Queues item for playback, returning the seconds spent waiting for room."""
+        start = time.perf_counter()
+        while not self.cancelled:
+            try:
+                self._ready.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        return time.perf_counter() - start
+
+    def play(self):
+        """Plays sentences as they become ready; returns when done or cancelled."""
+        backend = self.tts.backend
+        backend.reset()
+        wait_start = time.perf_counter()
+        play_start = None
+        while not self.cancelled:
+            try:
+                item = self._ready.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+
+            if item[0] == "audio":
+                if play_start is None:
+                    play_start = time.perf_counter()
+                backend.write(item[1], item[2])
+                if self.time_to_first_audio_ms is None and backend.first_sample_time is not None:
+                    self.time_to_first_audio_ms = self.tts._record_first_audio(self._start)
+                continue
+
+            timing = item[1]
+            backend.end_sentence()
+            if self.cancelled:
+                break
+            self._spoken = timing["index"] + 1
+            if self.time_to_first_audio_ms is None and backend.first_sample_time is not None:
+                self.time_to_first_audio_ms = self.tts._record_first_audio(self._start)
+            now = time.perf_counter()
+            timing["wait_ms"] = 1000.0 * ((play_start or now) - wait_start)
+            timing["play_ms"] = 1000.0 * (now - (play_start or now))
+            tracing.record("tts.playback", play_start, now, self.interaction, chars=len(timing["text"]))
+            self.metrics.append(timing)
+            wait_start, play_start = now, None
+        backend.finish()
+
+        for timing in self.metrics:
+            print(f"  TTS sentence: synth {timing['synth_ms']:.0f} ms, waited {timing['wait_ms']:.0f} ms, "
+                  f"played {timing['play_ms']:.0f} ms - {timing['text'][:40]!r}")
+
+    def cancel(self):
+        self._cancelled.set()
+        self.tts.stop_playback()
+
+    def remaining(self):
+        """The sentences not yet heard in full, starting with the one cut off, then the unread source.
+
+        Lazy: it waits for the producer to let go of the source only once it is iterated, so an
+        interrupting announcement is not held up by a reply that is still being generated.
+        """
+        def rest():
+            self._producer.join()
+            yield from self._pulled[self._spoken:]
+            yield from self._source
+        return rest()
 
 
 class TextToSpeech:
     def __init__(self, config_path="kortex/config.yaml"):
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
-        
+
         self.piper_path = config['tts']['piper_path']
         self.voices = config['tts']['voices']
         self.default_voice_id = config['tts']['default_voice']
-        
+        self.streaming = config['tts'].get('streaming', True)
+
         if self.default_voice_id not in self.voices:
             raise ValueError(f"Default voice '{self.default_voice_id}' not found in config voices.")
-        
+
+        self.last_time_to_first_audio_ms = None
+        self.current_stream = None
+        self.backend = create_backend(config['tts'].get('playback', {}))
+
+        cache_config = config['tts'].get('cache', {})
+        self.cache = None
+        if cache_config.get('enabled', True):
+            self.cache = PhraseCache(
+                cache_config.get('dir', 'cache/tts'),
+                max_bytes=int(cache_config.get('max_memory_mb', 32) * 1024 * 1024)
+            )
+
+        self.pool = None
+        if config['tts'].get('persistent_worker', True):
+            try:
+                self.pool = PiperPool(
+                    self.piper_path, self.voices,
+                    max_workers=config['tts'].get('max_workers', 2),
+                    timeout=config['tts'].get('synthesis_timeout', 15.0)
+                )
+                self.pool.get(self.default_voice_id)
+            except OSError as e:
+                print(f"Could not start a persistent Piper worker, falling back to one process per sentence: {e}")
+                self.pool = None
+
         print("TTS Engine Initialized with voices:", list(self.voices.keys()))
 
+    def _resolve_voice(self, voice_id):
+        return voice_id if voice_id in self.voices else self.default_voice_id
+
     def speak(self, text: str, voice_id: str = None):
         if not text:
             return
-        
-        selected_voice_id = voice_id if voice_id in self.voices else self.default_voice_id
-        voice_path = self.voices[selected_voice_id]
-        
+
+        selected_voice_id = self._resolve_voice(voice_id)
         print(f"Kortex ({selected_voice_id}): {text}")
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmpfile:
-            output_path = tmpfile.name
+        sentences = split_sentences(text) if self.streaming else [text]
+        self.speak_stream(sentences, selected_voice_id).play()
+
+    def speak_stream(self, sentences, voice_id: str = None):
+        """Starts synthesizing an iterable of sentences; call play() on the result to hear them."""
+        self.current_stream = SpeechStream(self, sentences, self._resolve_voice(voice_id))
+        return self.current_stream
 
-        command = [self.piper_path, '-m', voice_path, '-f', output_path]
-        
-        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
-        process.communicate(input=text.encode('utf-8'))
+    def cancel(self):
+        """Stops the reply that is currently being spoken, if any."""
+        if self.current_stream:
+            self.current_stream.cancel()
 
+    def _record_first_audio(self, start):
+        """Logs the time from start until the first sample reached the output device."""
+        self.last_time_to_first_audio_ms = 1000.0 * (self.backend.first_sample_time - start)
+        print(f"TTS time to first sample: {self.last_time_to_first_audio_ms:.0f} ms")
+        return self.last_time_to_first_audio_ms
+
+    def synthesize_chunks(self, text, voice_id, persist=False):
+        """Yields (pcm, sample_rate) chunks for text as they are produced; raises RuntimeError if Piper fails."""
+        voice_path = self.voices[voice_id]
+        if self.cache:
+            cached = self.cache.get(voice_id, voice_path, text)
+            if cached:
+                yield cached
+                return
+
+        if self.pool:
+            worker = self.pool.get(voice_id)
+            sample_rate = worker.sample_rate
+            chunks = []
+            stream = worker.synthesize_stream(text)
+            while True:
+                try:
+                    chunk = next(stream)
+                except StopIteration as stop:
+                    expected_bytes = stop.value
+                    break
+                chunks.append(chunk)
+                yield chunk, sample_rate
+            pcm = b"".join(chunks)
+            if expected_bytes is None or abs(len(pcm) - expected_bytes) > worker.slack_bytes():
+                # Never cache a clipped sentence: it would be replayed that way until the voice changes.
+                print(f"Not caching '{text}': got {len(pcm)} bytes, Piper reported {expected_bytes}.")
+                return
+        else:
+            pcm, sample_rate = self._synthesize_oneshot(text, voice_path)
+            yield pcm, sample_rate
+
+        if self.cache:
+            self.cache.put(voice_id, voice_path, text, pcm, sample_rate, persist=persist)
+
+    def synthesize(self, text, voice_id, persist=False):
+        """Returns (pcm, sample_rate) for text; raises RuntimeError if Piper fails."""
+        sample_rate = None
+        chunks = []
+        for chunk, sample_rate in self.synthesize_chunks(text, voice_id, persist=persist):
+            chunks.append(chunk)
+        return b"".join(chunks), sample_rate
+
+    def _synthesize_oneshot(self, text, voice_path):
+        command = [self.piper_path, '-m', voice_path, '--output-raw']
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        pcm, stderr = process.communicate(input=text.encode('utf-8'))
         if process.returncode != 0:
-            print(f"Error running Piper TTS: {process.stderr.decode()}")
-            os.remove(output_path)
+            raise RuntimeError(stderr.decode(errors='replace'))
+        return pcm, voice_sample_rate(voice_path)
+
+    def warmup(self, phrases, voice_id=None):
+        """Pre-renders fixed phrases into the cache (loading them from disk when possible)."""
+        if not self.cache:
             return
+        voice_id = self._resolve_voice(voice_id)
+        start = time.perf_counter()
+        self.cache.prune_stale(voice_id, self.voices[voice_id])
+        for phrase in phrases:
+            for sentence in split_sentences(phrase):
+                try:
+                    self.synthesize(sentence, voice_id, persist=True)
+                except RuntimeError as e:
+                    print(f"Could not pre-render '{sentence}': {e}")
+        print(f"TTS phrase cache warmed with {len(phrases)} phrases in {1000.0 * (time.perf_counter() - start):.0f} ms.")
 
-        try:
-            flags = winsound.SND_FILENAME | winsound.SND_NODEFAULT
-            winsound.PlaySound(output_path, flags)
-        except Exception as e:
-            print(f"Error playing audio file with winsound: {e}")
-        finally:
-            os.remove(output_path)
\ No newline at end of file
+    def play(self, pcm, sample_rate):
+        self.backend.reset()
+        self.backend.play(pcm, sample_rate)
+
+    def stop_playback(self):
+        self.backend.stop()
+
+    def check_health(self):
+        return self.pool.check_health() if self.pool else {}
+
+    def close(self):
+        self.cancel()
+        if self.pool:
+            self.pool.close()
+        self.backend.close()